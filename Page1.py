@@ -2,17 +2,24 @@ import os
 import re
 import time
 import functools
-import subprocess
 from logging_config import setup_logger, log_and_show_error
-from pytubefix import YouTube
-import yt_dlp
-from rich import print
+from info_cache import VideoInfoCache, extract_video_id
+from stream_download import CombinedProgress, download_streams
+from video_handle import extract_video
+from media_merge import merge_video_audio, merge_timing_hook, run_ffmpeg, FFMPEG_PATH
+from progress_model import JobProgress
+from ydl_pool import ydl_pool
+from scratch import scratch_area, make_job_key
+from format_selector import select_formats, options_from_pytubefix, options_from_yt_dlp, log_selection
 
 # ------------------------------
 # 初始化 Logger
 # ------------------------------
 logger = setup_logger(__name__)
 
+# 影片資訊快取（TTL 與容量由 main.py 依設定檔調整）
+video_info_cache = VideoInfoCache()
+
 def timeit(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
@@ -33,19 +40,6 @@ def sanitize_filename(filename):
     filename = re.sub(r'[\x00-\x1f\x80-\x9f]', '', filename)
     return filename
 
-def generate_new_filename(download_path, filename):
-    """
-    檢查 download_path 中是否已存在相同檔名，若存在則在檔名後方加上 (1), (2) 等標記。
-    """
-    filename = sanitize_filename(filename)
-    base, ext = os.path.splitext(filename)
-    new_filename = filename
-    counter = 1
-    while os.path.exists(os.path.join(download_path, new_filename)):
-        new_filename = f"{base} ({counter}){ext}"
-        counter += 1
-    return new_filename
-
 def resolution_sort_key(res, downloader):
     """自訂排序邏輯，讓解析度由高到低排列"""
     if downloader == 'pytubefix':
@@ -60,13 +54,23 @@ def resolution_sort_key(res, downloader):
             return 0  # 若解析度格式異常，則視為最小
 
 @timeit
-def get_video_info(url, downloader, file_format="mp4"):
-    """取得影片資訊，包括標題、可用畫質、封面圖 URL、可用字幕"""
+def get_video_info(url, downloader, file_format="mp4", use_cache=True):
+    """
+    取得影片資訊，包括標題、可用畫質、封面圖 URL、可用字幕，
+    並一併回傳解析結果 handle（命中快取時為 None），供 download_video_audio 沿用，避免重複解析。
+    """
+    if use_cache:
+        cached = video_info_cache.get(url, downloader, file_format)
+        if cached is not None:
+            logger.info(f"Video info cache hit: {video_info_cache.stats()}")
+            return cached + (None,)
+
     title = "Unknown Title"  # 預設值
     subtitles = ["No subtitle"]  # 預設值
+    handle = extract_video(url, downloader)
     if downloader == 'pytubefix':
         logger.info("Using pytubefix get info")
-        yt_obj = YouTube(url)
+        yt_obj = handle.source
         title = yt_obj.title
         thumbnail_url = yt_obj.thumbnail_url
 
@@ -87,18 +91,7 @@ def get_video_info(url, downloader, file_format="mp4"):
             resolutions.sort(key=lambda s: int(s.replace("kbps", "")), reverse=True)
     elif downloader == 'yt_dlp':
         logger.info("Using yt_dlp get info")
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'skip_download': True,
-            # 讓 yt_dlp 下載字幕資訊
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'subtitlesformat': 'srt',
-            'noplaylist': True,
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        info = handle.source
         title = info.get('title', 'Unknown Title')
         thumbnail_url = info.get('thumbnail')
         if file_format == "mp4":
@@ -118,71 +111,101 @@ def get_video_info(url, downloader, file_format="mp4"):
             available_subs = list(info["automatic_captions"].keys())
             subtitles = ["No subtitle"] + available_subs
 
-    return title, thumbnail_url, resolutions, subtitles
+    video_info_cache.put(url, downloader, file_format, title, thumbnail_url, resolutions, subtitles)
+    return title, thumbnail_url, resolutions, subtitles, handle
 
 @timeit
-def download_video_audio(url, resolution, download_path, downloader, file_format, download_subtitles, subtitle_lang, progress_callback=None):
+def download_video_audio(url, resolution, download_path, downloader, file_format, download_subtitles, subtitle_lang, progress_callback=None, handle=None):
+    """
+    下載影片或音訊。handle 為 get_video_info 回傳的解析結果，
+    與 url/downloader 相符時直接沿用（簽章 URL 過期才重新解析），否則重新解析。
+    progress_callback(fraction, stats)：fraction 依各階段實際位元組數/媒體時長加權，
+    stats 為 JobProgress 提供的速度、ETA 與各階段耗時；完成時以 -1 呼叫。
+    """
+    if handle is not None:
+        handle = handle.revalidated() if handle.matches(url, downloader) else None
+    # 每個工作使用獨立的暫存子目錄，同時進行的下載不會互相覆寫；
+    # 代號由工作內容決定，中斷後重新下載同一項目時可續傳（與播放清單工作的代號分開，不會共用目錄）
+    work_dir = scratch_area.job_dir(make_job_key("single", url, resolution, downloader, file_format))
+
     if downloader == 'pytubefix':
         logger.info("Using pytubefix to download video")
 
+        job = JobProgress(url, progress_callback)
+        # 同時下載多個串流時改由 CombinedProgress 依實際位元組數回報進度
+        combined_progress = None
+
         def on_progress(stream, chunk, bytes_remaining):
+                if combined_progress is not None:
+                    combined_progress.on_progress(stream, chunk, bytes_remaining)
+                    return
                 total = stream.filesize
                 downloaded = total - bytes_remaining
-                fraction = downloaded / total if total else 0
-                overall = fraction * 0.6
-                if progress_callback:
-                    progress_callback(overall)
+                job.update("download", downloaded / total if total else 0)
 
-        yt_obj = YouTube(url, on_progress_callback=on_progress)
+        if handle is not None:
+            yt_obj = handle.source
+            yt_obj.register_on_progress_callback(on_progress)
+        else:
+            from pytubefix import YouTube  # 延遲載入，縮短程式啟動時間
+            yt_obj = YouTube(url, on_progress_callback=on_progress)
         safe_title = sanitize_filename(yt_obj.title)
+        job.name = safe_title
+
+        def download_subtitle():
+            # 若使用者勾選下載字幕且選擇了非 "No subtitle" 語言，則處理字幕下載
+            try:
+                selected_caption = None
+                selected_caption = yt_obj.captions[subtitle_lang]
+                if selected_caption:
+                    subtitle_output_path = os.path.join(download_path, safe_title + f"_{subtitle_lang}.srt")
+                    selected_caption.save_captions(subtitle_output_path)
+                    logger.info(f"Succeeded to download subtitle: {subtitle_output_path}")
+                else:
+                    log_and_show_error("Cannot find the specified language subtitle")
+            except Exception as e:
+                log_and_show_error(f"Subtitle download failed: {e}")
+
+        # 字幕與影音串流互相獨立，與下載同時進行
+        side_tasks = [download_subtitle] if download_subtitles and subtitle_lang != "No subtitle" else []
 
         if file_format == 'mp4':
-            # 根據使用者指定解析度篩選影片串流（只取影片）
-            video_candidates = list(yt_obj.streams.filter(only_video=True, res=resolution))
-            if not video_candidates:
-                raise ValueError("找不到符合解析度的影片串流！")
-            video_stream = video_candidates[0]
+            # 依解析度與 mp4 相容性挑選影片/音訊串流組合，盡量讓合併時只需 -c copy
+            selection = select_formats(options_from_pytubefix(yt_obj.streams.filter(adaptive=True)), resolution, "mp4")
+            log_selection(safe_title, selection)
+            if selection is None or selection.audio is None:
+                raise ValueError("找不到符合解析度的影片或音訊串流！")
+            video_stream = selection.video.source
+            audio_stream = selection.audio.source
             # 判斷影片串流的副檔名
             video_ext = video_stream.subtype if hasattr(video_stream, "subtype") else video_stream.mime_type.split('/')[-1]
-            
-            # 從所有音訊串流中挑選音質最高的
-            audio_candidates = list(yt_obj.streams.filter(only_audio=True))
-            if not audio_candidates:
-                raise ValueError("找不到對應的音訊串流！")
-            def get_abr(stream):
-                try:
-                    return stream.abr if hasattr(stream, "abr") and stream.abr else 0
-                except:
-                    return 0
-            audio_candidates.sort(key=get_abr, reverse=True)
-            audio_stream = audio_candidates[0]
             # 判斷音訊串流的副檔名
             audio_ext = audio_stream.subtype if hasattr(audio_stream, "subtype") else audio_stream.mime_type.split('/')[-1]
 
             # 定義暫存檔名（依各自副檔名命名）
             video_temp_name = "video_temp." + video_ext
             audio_temp_name = "audio_temp." + audio_ext
-            video_path = os.path.join(download_path, video_temp_name)
-            audio_path = os.path.join(download_path, audio_temp_name)
+            video_path = os.path.join(work_dir, video_temp_name)
+            audio_path = os.path.join(work_dir, audio_temp_name)
+            merged_path = os.path.join(work_dir, "output.mp4")
 
             filename = safe_title + ".mp4"
-            unique_filename = generate_new_filename(download_path, filename)
-            output_path = os.path.join(download_path, unique_filename)
 
-            logger.info("Downloading video...")
-            video_stream.download(output_path=download_path, filename=video_temp_name)
-
-            logger.info("Downloading audio...")
-            audio_stream.download(output_path=download_path, filename=audio_temp_name)
+            logger.info("Downloading video and audio...")
+            combined_progress = CombinedProgress(
+                [video_stream, audio_stream], lambda fraction: job.update("download", fraction)
+            )
+            job.add_download_stage("download", combined_progress.total_bytes)
+            job.add_processing_stage("merge", stream_copy=not selection.needs_reencode)
+            download_streams(
+                [(video_stream, work_dir, video_temp_name), (audio_stream, work_dir, audio_temp_name)],
+                side_tasks, on_progress
+            )
 
             logger.info("Merging video and audio...")
-            merge_video_audio(video_path, audio_path, output_path, progress_callback)
-            
-            logger.info("Cleaning up temporary files...")
-            if os.path.exists(video_path):
-                os.remove(video_path)
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            merge_video_audio(video_path, audio_path, merged_path,
+                              lambda fraction: job.update("merge", fraction), 0.0, 1.0)
+            output_path = scratch_area.publish_unique(merged_path, download_path, filename)
             
         elif file_format == 'mp3':
              # 嘗試解析用戶選擇的位元率，例如 "320kbps"
@@ -213,51 +236,43 @@ def download_video_audio(url, resolution, download_path, downloader, file_format
             audio_ext = matching_stream.subtype if hasattr(matching_stream, "subtype") else matching_stream.mime_type.split('/')[-1]
             
             audio_temp_name = "audio_temp." + audio_ext
-            audio_path = os.path.join(download_path, audio_temp_name)
+            audio_path = os.path.join(work_dir, audio_temp_name)
+            converted_path = os.path.join(work_dir, "output.mp3")
             filename = safe_title + ".mp3"
-            unique_filename = generate_new_filename(download_path, filename)
-            output_path = os.path.join(download_path, unique_filename)
 
             logger.info("Downloading audio...")        
-            if progress_callback: progress_callback(0.0)
-            matching_stream.download(output_path=download_path, filename=audio_temp_name)
+            job.add_download_stage("download", matching_stream.filesize or 0)
+            job.add_processing_stage("encode", stream_copy=False)
+            job.update("download", 0.0)
+            download_streams([(matching_stream, work_dir, audio_temp_name)], side_tasks, on_progress)
             
             logger.info("Converting audio format...")
-            if progress_callback: progress_callback(0.6)
-            ffmpeg_path = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')
             ffmpeg_command = [
-                ffmpeg_path, '-i', audio_path, '-vn', '-acodec', 'libmp3lame', '-q:a', '2', output_path
+                FFMPEG_PATH, '-y', '-i', audio_path, '-vn', '-acodec', 'libmp3lame', '-q:a', '2', converted_path
             ]
-            process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                       text=True, encoding='utf-8', errors='replace',
-                                       creationflags=subprocess.CREATE_NO_WINDOW)
-            for line in process.stderr:
-                # 解析進度更新 progress_bar（根據需求調整）
-                pass
-            process.wait()
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-        
-        # 若使用者勾選下載字幕且選擇了非 "No subtitle" 語言，則處理字幕下載
-        if download_subtitles and subtitle_lang != "No subtitle":
-            try:
-                selected_caption = None
-                selected_caption = yt_obj.captions[subtitle_lang]
-                if selected_caption:
-                    subtitle_output_path = os.path.join(download_path, safe_title + f"_{subtitle_lang}.srt")
-                    selected_caption.save_captions(subtitle_output_path)
-                    logger.info(f"Succeeded to download subtitle: {subtitle_output_path}")
-                else:
-                    log_and_show_error("Cannot find the specified language subtitle")
-            except Exception as e:
-                log_and_show_error(f"Subtitle download failed: {e}")
+            # 依 ffmpeg 回報的媒體時間更新轉檔階段進度
+            returncode = run_ffmpeg(ffmpeg_command, lambda fraction: job.update("encode", fraction))
+            if returncode != 0:
+                raise RuntimeError(f"ffmpeg mp3 conversion failed with exit code {returncode}")
+            output_path = scratch_area.publish_unique(converted_path, download_path, filename)
 
         # 處理完成
+        scratch_area.release(work_dir)
+        job.complete()
+        job.log_summary()
         if progress_callback: progress_callback(-1)
         return output_path
 
     elif downloader == 'yt_dlp':
         logger.info("Using yt_dlp to download video")
+        # 暫存檔名帶入影片 ID，中斷後重新下載同一支影片時 yt_dlp 可接續 .part 檔
+        video_id = extract_video_id(url)
+        # 先取得格式清單供格式選擇使用；之後直接以這份 info 下載，不再重新解析
+        if handle is None:
+            handle = extract_video(url, downloader)
+        job = JobProgress(handle.title, progress_callback)
+        # 預估下載位元組數（格式選擇得知時），實際大小由 progress_hook 逐檔回報
+        expected_bytes = 0
         if file_format == 'mp4':
             # 從解析度字串中取得寬高，例如 "1920x1080"
             try:
@@ -269,21 +284,33 @@ def download_video_audio(url, resolution, download_path, downloader, file_format
                     width = 1280
             except Exception as e:
                 raise ValueError("解析解析度失敗，請檢查格式是否正確(例如 '1920x1080')") from e
-            # 將下載檔案暫存為固定名稱，例如 temp_download.mp4
-            temp_template = os.path.join(download_path, "temp_download.%(ext)s")
+            # 將下載檔案暫存為 <工作暫存目錄>/temp_download_<影片ID>.mp4
+            temp_template = os.path.join(work_dir, f"temp_download_{video_id}.%(ext)s")
+            # 由格式評分挑出的確切 format_id 優先，其後保留原本的篩選字串作為備援
+            selection = select_formats(options_from_yt_dlp(handle.source.get('formats', [])), resolution, "mp4")
+            log_selection(handle.title, selection)
+            format_str = (
+                f'bestvideo[width={width}][height={height}]+bestaudio[ext=m4a]/'
+                f'bestvideo[ext=mp4][width={width}][height={height}]+bestaudio[ext=mp4]/best'
+            )
+            if selection is not None:
+                format_str = f'{selection.yt_dlp_format}/{format_str}'
+                expected_bytes = selection.video.filesize + (selection.audio.filesize if selection.audio else 0)
+            job.add_download_stage("download", expected_bytes)
+            job.add_processing_stage("merge", stream_copy=True)
+            # yt_dlp 內建後製器名稱 -> 進度模型的階段
+            stage_of = {'Merger': "merge"}
             ydl_opts = {
-                # 第一段先嘗試 webm，再嘗試 mp4，最後 fallback 到 best
-                'format': (
-                    f'bestvideo[ext=webm][width={width}][height={height}]+bestaudio[ext=webm]/'
-                    f'bestvideo[ext=mp4][width={width}][height={height}]+bestaudio[ext=mp4]/best'
-                ),
+                # 影片不限編碼（vp9/av1/avc1 皆可直接封裝進 mp4），音訊優先取 AAC (m4a)，
+                # 讓 yt_dlp 合併時只需 -c copy，不必再轉碼音訊；最後 fallback 到 best
+                'format': format_str,
                 'outtmpl': temp_template,
                 'noplaylist': True,
                 'merge_output_format': 'mp4',
-                'postprocessor_args': ['-c:a', 'aac'],  # 強制使用 aac 音訊編碼
+                'postprocessor_hooks': [merge_timing_hook()],
             }
         elif file_format == 'mp3':
-            temp_template = os.path.join(download_path, "temp_download.%(ext)s")
+            temp_template = os.path.join(work_dir, f"temp_download_{video_id}.%(ext)s")
             # 嘗試解析用戶選擇的位元率
             selected_bitrate = None
             try:
@@ -306,26 +333,54 @@ def download_video_audio(url, resolution, download_path, downloader, file_format
                     'preferredquality': preferred_quality,
                 }],
             }
+            job.add_download_stage("download")
+            job.add_processing_stage("encode", stream_copy=False)
+            stage_of = {'ExtractAudio': "encode"}
         # 若勾選下載字幕且選擇了特定語言，加入 yt_dlp 下載字幕的選項
         if download_subtitles and subtitle_lang != "No subtitle":
             ydl_opts["subtitlesformat"] = 'srt'
             ydl_opts["writesubtitles"] = True
             ydl_opts["writeautomaticsub"] = True
             ydl_opts["subtitleslangs"] = [subtitle_lang]
+            # 字幕直接寫到下載目錄，不隨暫存目錄一併刪除
+            ydl_opts["outtmpl"] = {
+                'default': temp_template,
+                'subtitle': os.path.join(download_path, f"temp_download_{video_id}.%(ext)s"),
+            }
         
+        # mp4 會依序下載影片與音訊兩個檔案，以檔名分別累計位元組，
+        # 避免第一個檔案完成時進度直接跳到結尾
+        file_totals = {}
+        file_downloaded = {}
+
         def progress_hook(d):
+            name = d.get('filename')
             if d['status'] == 'downloading':
-                current = d.get('downloaded_bytes', 0)
-                total = d.get('total_bytes_estimate') or d.get('total_bytes') or 1
-                fraction = current / total if total else 0
-                if progress_callback:
-                    progress_callback(fraction * 0.6)
+                file_totals[name] = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                file_downloaded[name] = d.get('downloaded_bytes', 0)
             elif d['status'] == 'finished':
-                if progress_callback:
-                    progress_callback(0.99)
+                size = d.get('total_bytes') or file_totals.get(name) or file_downloaded.get(name, 0)
+                file_totals[name] = file_downloaded[name] = size
+            else:
+                return
+            total = max(expected_bytes, sum(file_totals.values()))
+            job.set_stage_bytes("download", total)
+            job.update("download", sum(file_downloaded.values()) / total if total else 0)
+
+        def postprocessor_hook(d):
+            stage = stage_of.get(d.get('postprocessor'))
+            if stage is None:
+                return
+            if d['status'] == 'started':
+                job.finish_stage("download")
+                job.update(stage, 0.0)
+            elif d['status'] == 'finished':
+                job.finish_stage(stage)
         ydl_opts['progress_hooks'] = [progress_hook]
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+        ydl_opts.setdefault('postprocessor_hooks', []).append(postprocessor_hook)
+        with ydl_pool.lease(ydl_opts) as ydl:
+            # 直接以先前解析的 info 進行格式選擇與下載，不再重新解析
+            info = ydl.process_ie_result(handle.info_copy(), download=True)
         if file_format == 'mp4':
             output_ext = 'mp4'
         else:
@@ -335,52 +390,14 @@ def download_video_audio(url, resolution, download_path, downloader, file_format
         # 利用自訂函式先清理標題，再產生唯一檔案名稱
         safe_title = sanitize_filename(raw_title)
         filename = safe_title + f".{output_ext}"
-        unique_filename = generate_new_filename(download_path, filename)
-        final_filepath = os.path.join(download_path, unique_filename)
         # 取得暫存檔案的完整路徑
-        temp_filepath = os.path.join(download_path, f"temp_download.{output_ext}")
-        # 重新命名暫存檔案
-        os.rename(temp_filepath, final_filepath)
+        temp_filepath = os.path.join(work_dir, f"temp_download_{video_id}.{output_ext}")
+        # 於下載目錄配置不重複的檔名，並將暫存檔案原子地發佈過去
+        final_filepath = scratch_area.publish_unique(temp_filepath, download_path, filename)
         
         # 處理完成
+        scratch_area.release(work_dir)
+        job.complete()
+        job.log_summary()
         if progress_callback: progress_callback(-1)
         return final_filepath
-
-@timeit
-def merge_video_audio(video_path, audio_path, output_path, progress_callback=None):
-    """使用 FFmpeg 合併影片和音訊"""
-    ffmpeg_path = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')  # 指定 ffmpeg 的完整路徑
-    ffmpeg_command = [
-        ffmpeg_path, '-i', video_path, '-i', audio_path, '-c:v', 'copy', '-c:a', 'aac', '-strict', 'experimental', output_path
-    ]
-    
-    process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace', creationflags=subprocess.CREATE_NO_WINDOW)
-    
-    total_duration = None
-    # 用正規表達式匹配 "Duration: HH:MM:SS.xx"
-    duration_pattern = re.compile(r'Duration: (\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)')
-    # 用正規表達式匹配 "time=HH:MM:SS.xx"
-    time_pattern = re.compile(r'time=(\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)')
-
-    for line in process.stderr:
-        # 先解析總長度
-        if total_duration is None:
-            duration_match = duration_pattern.search(line)
-            if duration_match:
-                hours, minutes, seconds = duration_match.groups()
-                total_duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
-        # 若已取得總長度，解析當前處理進度
-        time_match = time_pattern.search(line)
-        if time_match and total_duration:
-            hours, minutes, seconds = time_match.groups()
-            time_in_seconds = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
-            # 合併階段佔總進度的 40%，從 60% 到 100%
-            progress = 0.6 + (time_in_seconds / total_duration) * 0.4
-            progress = min(progress, 1.0)
-            if progress_callback:
-                progress_callback(progress)
-    
-    process.wait()
-    if progress_callback:
-        progress_callback(0.99)
-    logger.info("Merging video and audio completed")
@@ -1,29 +1,33 @@
 import os
 import re
-import time
-import functools
-import subprocess
-from pytubefix import YouTube, Playlist
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from logging_config import setup_logger, log_and_show_error
-import yt_dlp
-import uuid
-from rich import print
+from stream_download import download_streams, CombinedProgress
+from media_merge import merge_video_audio, merge_timing_hook, run_ffmpeg, FFMPEG_PATH
+from scratch import scratch_area, make_job_key
+from download_archive import download_archive
+from video_handle import extract_video
+from ydl_pool import ydl_pool
+from format_selector import select_formats, options_from_pytubefix, options_from_yt_dlp, log_selection
+from progress_model import JobProgress
 
 # ------------------------------
 # 初始化 Logger
 # ------------------------------
 logger = setup_logger(__name__)
 
-def timeit(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        elapsed = end_time - start_time
-        logger.info(f"{func.__name__} executed in {elapsed:.4f} seconds")
-        return result
-    return wrapper
+# pytubefix 播放清單逐一取得標題時的並行數與單一項目逾時秒數
+title_workers = 8
+title_timeout = 15
+
+def configure_title_resolution(workers=None, timeout=None):
+    global title_workers, title_timeout
+    if workers is not None:
+        title_workers = max(1, workers)
+    if timeout is not None:
+        title_timeout = timeout
 
 def sanitize_filename(filename):
     """
@@ -34,149 +38,223 @@ def sanitize_filename(filename):
     filename = re.sub(r'[\x00-\x1f\x80-\x9f]', '', filename)
     return filename
 
-def generate_new_filename(download_path, filename):
+def resolve_titles(video_urls, youtube_cls, workers=None, timeout=None):
+    """
+    以有限大小的執行緒池同時取得各影片標題，依原本順序逐一產生 (url, title)。
+    video_urls 可為產生器：只預先送出 workers * 2 個項目，播放清單仍在分頁讀取時即可開始產生結果。
+    單一項目失敗或超過 timeout 秒仍未完成時以 "Unknown" 代替，不影響其他項目。
+    """
+    workers = workers or title_workers
+    timeout = timeout or title_timeout
+
+    def fetch_title(video_url):
+        return youtube_cls(video_url).title
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="title")
+    pending = deque()
+    urls = iter(video_urls)
+
+    def fill():
+        for video_url in urls:
+            pending.append((video_url, executor.submit(fetch_title, video_url)))
+            if len(pending) >= workers * 2:
+                break
+
+    try:
+        fill()
+        while pending:
+            video_url, future = pending.popleft()
+            try:
+                title = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                logger.warning(f"Title lookup timed out after {timeout}s: {video_url}")
+                title = "Unknown"
+            except Exception as e:
+                logger.warning(f"Title lookup failed for {video_url}: {e}")
+                title = "Unknown"
+            yield video_url, title or "Unknown"
+            fill()
+    finally:
+        # 不等待逾時仍卡住的請求，也取消尚未開始的項目（例如呼叫端提前結束）
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _iter_yt_dlp_entries(url):
     """
-    檢查 download_path 中是否已存在相同檔名，若存在則在檔名後方加上 (1), (2) 等標記。
+    以 yt_dlp 平面列出播放清單，逐頁產生 (id, title)。
+    process=False 時 entries 為產生器，每讀到一頁播放清單就能先交出該頁的項目。
     """
-    filename = sanitize_filename(filename)
-    base, ext = os.path.splitext(filename)
-    new_filename = filename
-    counter = 1
-    while os.path.exists(os.path.join(download_path, new_filename)):
-        new_filename = f"{base} ({counter}){ext}"
-        counter += 1
-    return new_filename
-
-@timeit
-def parse_playlist(url, resolution, downloader, file_format="mp4"):
+    ydl_opts = {
+        'quiet': True,
+        'extract_flat': 'in_playlist',  # 只列出 id 與標題，不逐一解析影片
+        'skip_download': True,
+        'noplaylist': False,    # 強制解析播放清單
+    }
+    with ydl_pool.lease(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        # watch?v=...&list=... 會先被轉向到播放清單頁面
+        for _ in range(3):
+            if info.get('_type') not in ('url', 'url_transparent'):
+                break
+            info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+        if "entries" not in info:
+            # 由呼叫端決定如何提示使用者（列出 0 筆時會顯示錯誤）
+            logger.warning(f"No playlist entries found for {url}")
+            return
+        for entry in info['entries']:
+            if entry and entry.get('id'):
+                yield entry['id'], entry.get("title")
+
+def iter_playlist(url, resolution, downloader, file_format="mp4"):
     """
-    解析播放清單 URL，若不是播放清單則印出錯誤並回傳空列表；
-    否則回傳列表，每筆為影片資料字典，包含 "title", "resolution", "format", "url"。
-    若 downloader 為 "yt_dlp"，使用 yt_dlp 解析；若為 "pytubefix"，使用 pytubefix 解析。
+    解析播放清單 URL，逐筆產生影片資料字典（"title", "resolution", "format", "url"）；不是播放清單時不產生任何項目。
+    播放清單仍在分頁讀取時就能交出項目，呼叫端可邊讀取邊顯示、邊開始下載。
+    yt_dlp 只以平面模式讀取 id 與標題，各影片的格式與可用性於下載前才由 enrich_playlist_item 解析。
     """
     if "list=" not in url:
-        return []
-    
-    playlist = []
-    
+        return
+
+    def make_item(video_url, title):
+        return {
+            "title": title or "Unknown",
+            "resolution": resolution,
+            "format": file_format,
+            "url": video_url
+        }
+
     if downloader == "yt_dlp":
         logger.info("Using yt_dlp to parse playlist...")
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': False,  # 取得完整資訊
-            'skip_download': True,
-            'noplaylist': False,    # 強制解析播放清單
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-        if "entries" not in info:
-            log_and_show_error("No playlist entries found!")
-            return []
-        for entry in info['entries']:
-            video_url = f"https://www.youtube.com/watch?v={entry['id']}"
-            playlist.append({
-                "title": entry.get("title", "Unknown"),
-                "resolution": resolution,
-                "format": file_format,
-                "url": video_url
-            })
-        return playlist
+        for video_id, title in _iter_yt_dlp_entries(url):
+            yield make_item(f"https://www.youtube.com/watch?v={video_id}", title)
     elif downloader == "pytubefix":
         logger.info("Using pytubefix to parse playlist...")
+        from pytubefix import YouTube, Playlist  # 延遲載入，縮短程式啟動時間
         try:
             pl = Playlist(url)
         except Exception as e:
             log_and_show_error(f"Failed to parse playlist (pytubefix): {e}")
-            return []
-        # 假設 pl.video_urls 回傳所有影片 URL
-        for video_url in pl.video_urls:
-            try:
-                yt_obj = YouTube(video_url)
-                title = yt_obj.title
-            except Exception as e:
-                title = "Unknown"
-            playlist.append({
-                "title": title,
-                "resolution": resolution,
-                "format": file_format,
-                "url": video_url
-            })
-        return playlist
+            return
+        # url_generator 逐頁產生影片 URL，標題由 resolve_titles 並行取得
+        for video_url, title in resolve_titles(pl.url_generator(), YouTube):
+            yield make_item(video_url, title)
     else:
         log_and_show_error("Unknown downloader")
-        return []
 
-@timeit
-def download_video_audio_playlist(url, resolution, download_path, downloader, file_format):
-    temp_id = uuid.uuid4().hex
+def archived_playlist_item(item):
+    """依下載紀錄檢查項目是否已完成（模式見 download_archive），已完成時回傳既有檔案路徑"""
+    return download_archive.check(item["url"], item["format"], item["resolution"])
+
+def enrich_playlist_item(item, downloader):
+    """
+    解析播放清單項目的完整資訊（格式、可用性），並以完整資訊中的標題更新 item。
+    平面列表中缺少標題的項目會在此補上。回傳 VideoHandle 供下載沿用。
+    """
+    handle = extract_video(item["url"], downloader)
+    item["title"] = handle.title or item.get("title", "Unknown")
+    return handle
+
+def _mp3_command(source_path, output_path, bitrate=None):
+    """轉成 mp3 的 ffmpeg 指令；指定位元率時使用 CBR，否則使用 VBR 品質 2"""
+    quality = ['-b:a', f'{bitrate}k'] if bitrate else ['-q:a', '2']
+    return [FFMPEG_PATH, '-y', '-i', source_path, '-vn', '-acodec', 'libmp3lame', *quality, output_path]
+
+def _parse_bitrate(resolution):
+    try:
+        return int(resolution.replace("kbps", "").strip())
+    except Exception:
+        return None
+
+def _yt_dlp_download(handle, ydl_opts):
+    """以 yt_dlp 下載已解析的影片，回傳實際寫入的檔案路徑"""
+    with ydl_pool.lease(ydl_opts) as ydl:
+        # 沿用先前取得的 info，不再重新解析一次（yt_dlp 會修改 info，因此使用複本）
+        info = ydl.process_ie_result(handle.info_copy(), download=True)
+    downloads = info.get('requested_downloads') or [{}]
+    return downloads[0].get('filepath') or downloads[0].get('_filename')
+
+def _yt_dlp_progress_hook(progress, expected_bytes=0):
+    """
+    將 yt_dlp 逐檔回報的位元組數累計到 progress 的 download 階段。
+    影音同時下載時依檔名分別累計，避免第一個檔案完成時進度直接跳到結尾。
+    """
+    file_totals = {}
+    file_downloaded = {}
+    lock = threading.Lock()
+
+    def hook(d):
+        name = d.get('filename')
+        with lock:
+            if d['status'] == 'downloading':
+                file_totals[name] = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                file_downloaded[name] = d.get('downloaded_bytes', 0)
+            elif d['status'] == 'finished':
+                size = d.get('total_bytes') or file_totals.get(name) or file_downloaded.get(name, 0)
+                file_totals[name] = file_downloaded[name] = size
+            else:
+                return
+            total = max(expected_bytes, sum(file_totals.values()))
+            downloaded = sum(file_downloaded.values())
+        progress.set_stage_bytes("download", total)
+        progress.update("download", downloaded / total if total else 0)
+    return hook
+
+def fetch_playlist_item(url, resolution, download_path, downloader, file_format, handle=None, job_id=None, progress=None):
+    """
+    下載播放清單單一影片的網路階段：只下載串流到暫存目錄，不執行 ffmpeg。
+    回傳交給 finish_playlist_item 的工作描述（dict）：
+        action: "merge"（合併影音）、"mp3"（轉為 mp3）或 "publish"（已是成品，只需發佈）
+        inputs: 暫存目錄中的輸入檔，output: 處理後的暫存檔
+    handle 為 enrich_playlist_item 取得的解析結果，與 url/downloader 相符時直接沿用（簽章 URL 過期才重新解析）。
+    job_id 為 job_queue 的工作代號，用來區分內容相同的不同工作（例如清單中重複的影片）。
+    progress 為此工作的 JobProgress，下載位元組數與 yt_dlp 內建的合併會回報到其中，之後交給 finish_playlist_item 沿用。
+    """
+    if handle is not None and handle.matches(url, downloader):
+        handle = handle.revalidated()
+    else:
+        handle = extract_video(url, downloader)
+    # 暫存目錄由工作代號與內容決定，程式中斷後還原同一工作時可沿用先前的暫存檔續傳；
+    # 內容相同的不同工作（重複項目、單一影片頁同時下載同一影片）使用不同目錄，完成時不會刪到彼此的暫存檔
+    temp_id = make_job_key("playlist", job_id, url, resolution, downloader, file_format)
+    work_dir = scratch_area.job_dir(temp_id)
+    if progress is None:
+        progress = JobProgress(temp_id)
+    job = {"temp_id": temp_id, "work_dir": work_dir, "download_path": download_path,
+           "url": url, "format": file_format, "resolution": resolution, "title": handle.title}
     if downloader == 'pytubefix':
         logger.info("Using pytubefix to download video...")
-        yt_obj = YouTube(url)
+        yt_obj = handle.source
         safe_title = sanitize_filename(yt_obj.title)
 
         if file_format == 'mp4':
-            filename = safe_title + ".mp4"
-            unique_filename = generate_new_filename(download_path, filename)
-            output_path = os.path.join(download_path, unique_filename)
-            
-            # 將 "1920x1080" 轉換為 "1080p" 供 pytubefix 使用
-            if "x" in resolution:
-                _, height_str = resolution.split('x')
-                new_res = height_str + "p"
-            else:
-                new_res = resolution
-
-            # 先嘗試選取 mp4 格式的影片串流，再回退到 webm
-            video_stream = yt_obj.streams.filter(res=new_res, only_video=True, file_extension='mp4').first()
-            video_stream_format = 'mp4'
-            if not video_stream:
-                video_stream = yt_obj.streams.filter(res=new_res, only_video=True, file_extension='webm').first()
-                video_stream_format = 'webm'
-                if not video_stream:
-                    resolutions = list(set([stream.resolution for stream in yt_obj.streams.filter(adaptive=True, only_video=True) if stream.resolution]))
-                    resolutions.sort(key=lambda res: int(res.replace("p", "")) if res and res.replace("p", "").isdigit() else 0, reverse=True)
-                    if resolutions:
-                        video_stream = yt_obj.streams.filter(res=resolutions[0], only_video=True, file_extension='mp4').first()
-                        video_stream_format = 'mp4'
-                        if not video_stream:
-                            video_stream = yt_obj.streams.filter(res=resolutions[0], only_video=True, file_extension='webm').first()
-                            video_stream_format = 'webm'
-            # 選取最佳音訊串流：先嘗試 mp4，再回退至 webm
-            audio_stream = yt_obj.streams.filter(only_audio=True, file_extension='mp4').order_by('abr').desc().first()
-            audio_stream_format = 'mp4'
-            if not audio_stream:
-                audio_stream = yt_obj.streams.filter(only_audio=True, file_extension='webm').order_by('abr').desc().first()
-                audio_stream_format = 'webm'
-
-            if not video_stream or not audio_stream:
+            # 依解析度與 mp4 相容性挑選影片/音訊串流組合（找不到指定解析度時取最接近者），
+            # 盡量讓合併時只需 -c copy
+            selection = select_formats(options_from_pytubefix(yt_obj.streams.filter(adaptive=True)), resolution, "mp4")
+            log_selection(f"{temp_id} {safe_title}", selection)
+            if selection is None or selection.audio is None:
                 raise ValueError(f"{temp_id} 找不到對應的影片或音訊流！")
-            
+            video_stream = selection.video.source
+            audio_stream = selection.audio.source
+
             # 根據串流格式決定暫存檔案名稱
-            video_temp_filename = f"video_{temp_id}.{video_stream_format}"
-            audio_temp_filename = f"audio_{temp_id}.{audio_stream_format}"
-            video_temp_path = os.path.join(download_path, video_temp_filename)
-            audio_temp_path = os.path.join(download_path, audio_temp_filename)
-
-            logger.info(f"{temp_id} 正在下載影片...")
-            video_stream.download(output_path=download_path, filename=video_temp_filename)
-            logger.info(f"{temp_id} 正在下載音訊...")
-            audio_stream.download(output_path=download_path, filename=audio_temp_filename)
-            logger.info(f"{temp_id} 正在合併影片與音訊...")
-            merge_video_audio(video_temp_path, audio_temp_path, output_path)
-
-            logger.info(f"{temp_id} 清理暫存檔案...")
-            if os.path.exists(video_temp_path):
-                os.remove(video_temp_path)
-            if os.path.exists(audio_temp_path):
-                os.remove(audio_temp_path)
-            return output_path
-            
+            video_temp_filename = f"video_{temp_id}.{video_stream.subtype}"
+            audio_temp_filename = f"audio_{temp_id}.{audio_stream.subtype}"
+
+            logger.info(f"{temp_id} 正在同時下載影片與音訊...")
+            combined_progress = CombinedProgress(
+                [video_stream, audio_stream], lambda fraction: progress.update("download", fraction)
+            )
+            progress.add_download_stage("download", combined_progress.total_bytes)
+            progress.add_processing_stage("merge", stream_copy=not selection.needs_reencode)
+            download_streams([
+                (video_stream, work_dir, video_temp_filename),
+                (audio_stream, work_dir, audio_temp_filename)
+            ], on_progress=combined_progress.on_progress)
+            job.update(action="merge", filename=safe_title + ".mp4",
+                       inputs=[os.path.join(work_dir, video_temp_filename), os.path.join(work_dir, audio_temp_filename)],
+                       output=os.path.join(work_dir, "output.mp4"))
+            return job
+
         elif file_format == 'mp3':
-            try:
-                selected_bitrate = int(resolution.replace("kbps", ""))
-            except Exception as e:
-                selected_bitrate = None
-            
+            selected_bitrate = _parse_bitrate(resolution)
             audio_candidates = list(yt_obj.streams.filter(only_audio=True))
             if not audio_candidates:
                 raise ValueError("找不到對應的音訊串流！")
@@ -196,35 +274,27 @@ def download_video_audio_playlist(url, resolution, download_path, downloader, fi
                 audio_candidates.sort(key=get_abr, reverse=True)
                 matching_stream = audio_candidates[0]
 
-            # 準備檔名與輸出路徑
-            filename = safe_title + ".mp3"
-            unique_filename = generate_new_filename(download_path, filename)
-            unique_filename = generate_new_filename(download_path, filename)
-            output_path = os.path.join(download_path, unique_filename)
-
             audio_stream_format = matching_stream.subtype if hasattr(matching_stream, "subtype") else matching_stream.mime_type.split('/')[-1]
             audio_temp_filename = f"audio_{temp_id}.{audio_stream_format}"
-            audio_temp_path = os.path.join(download_path, audio_temp_filename)
-            
 
             logger.info("正在下載音訊...")
-            matching_stream.download(output_path=download_path, filename=audio_temp_filename)
-            
-            logger.info("正在轉換音訊格式...")
-            ffmpeg_path = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')
-            ffmpeg_command = [
-                ffmpeg_path, '-i', audio_temp_path, '-vn', '-acodec', 'libmp3lame', '-q:a', '2', output_path
-            ]
-            process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                       text=True, encoding='utf-8', errors='replace',
-                                       creationflags=subprocess.CREATE_NO_WINDOW)
-            process.wait()
-            if os.path.exists(audio_temp_path):
-                os.remove(audio_temp_path) 
-            return output_path
+            combined_progress = CombinedProgress(
+                [matching_stream], lambda fraction: progress.update("download", fraction)
+            )
+            progress.add_download_stage("download", combined_progress.total_bytes)
+            progress.add_processing_stage("encode", stream_copy=False)
+            download_streams([(matching_stream, work_dir, audio_temp_filename)],
+                             on_progress=combined_progress.on_progress)
+            job.update(action="mp3", filename=safe_title + ".mp3", bitrate=None,
+                       inputs=[os.path.join(work_dir, audio_temp_filename)],
+                       output=os.path.join(work_dir, "output.mp3"))
+            return job
 
     elif downloader == 'yt_dlp':
         logger.info("Using yt_dlp to download video...")
+        # 影片格式資訊來自已解析的 handle，不另外解析
+        info_pre = handle.source
+        safe_title = sanitize_filename(info_pre.get('title') or "Unknown")
         if file_format == 'mp4':
             try:
                 width_str, height_str = resolution.split('x')
@@ -235,81 +305,121 @@ def download_video_audio_playlist(url, resolution, download_path, downloader, fi
                     width = 1280
             except Exception as e:
                 raise ValueError("解析解析度失敗，請檢查格式是否正確(例如 '1920x1080')") from e
-            
-            # 先取得影片格式資訊，不下載影片
-            with yt_dlp.YoutubeDL({'quiet': True, 'skip_download': True, 'noplaylist': True}) as ydl:
-                info_pre = ydl.extract_info(url, download=False)
+
+            selection = select_formats(options_from_yt_dlp(info_pre.get('formats', [])), resolution, "mp4")
+            log_selection(f"{temp_id} {info_pre.get('title')}", selection)
+            if selection is not None and selection.audio is not None:
+                # 影音分開且同時下載，合併交給 CPU 階段，yt_dlp 不在網路階段內執行 ffmpeg
+                expected_bytes = selection.video.filesize + selection.audio.filesize
+                progress.add_download_stage("download", expected_bytes)
+                progress.add_processing_stage("merge", stream_copy=not selection.needs_reencode)
+                progress_hook = _yt_dlp_progress_hook(progress, expected_bytes)
+                with ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"fetch-{temp_id}") as executor:
+                    futures = [
+                        executor.submit(_yt_dlp_download, handle, {
+                            'format': str(option.format_id),
+                            'outtmpl': os.path.join(work_dir, f"{kind}_{temp_id}.{option.source.get('ext') or 'bin'}"),
+                            'noplaylist': True,
+                            'progress_hooks': [progress_hook],
+                        })
+                        for kind, option in (("video", selection.video), ("audio", selection.audio))
+                    ]
+                    inputs = [future.result() for future in futures]
+                job.update(action="merge", filename=safe_title + ".mp4", inputs=inputs,
+                           output=os.path.join(work_dir, "output.mp4"))
+                return job
+
+            # 找不到可分開下載的組合時，沿用篩選字串由 yt_dlp 自行下載並合併
             available_resolutions = {stream.get('resolution') for stream in info_pre.get('formats', []) if stream.get('resolution')}
+            # 音訊優先取 AAC (m4a)，合併成 mp4 時可直接 -c copy，不必轉碼
             if resolution in available_resolutions:
-                format_str = f'bestvideo[ext=webm][width={width}][height={height}]+bestaudio[ext=webm]/best[ext=webm]'
+                format_str = (f'bestvideo[ext=webm][width={width}][height={height}]+bestaudio[ext=m4a]/'
+                              f'bestvideo[ext=webm][width={width}][height={height}]+bestaudio[ext=webm]/best[ext=webm]')
             else:
-                format_str = "bestvideo[ext=webm]+bestaudio[ext=webm]/best[ext=webm]"
+                format_str = "bestvideo[ext=webm]+bestaudio[ext=m4a]/bestvideo[ext=webm]+bestaudio[ext=webm]/best[ext=webm]"
+            if selection is not None:
+                format_str = f"{selection.yt_dlp_format}/{format_str}"
+            temp_template = os.path.join(work_dir, f"temp_download_{temp_id}.%(ext)s")
+            progress.add_download_stage("download")
+            progress.add_processing_stage("merge", stream_copy=True)
 
-            temp_template = os.path.join(download_path, f"temp_download_{temp_id}.%(ext)s")
-            ydl_opts = {
+            def merger_hook(d):
+                # yt_dlp 內建合併在網路階段執行，仍計入此工作的 merge 階段
+                if d.get('postprocessor') != 'Merger':
+                    return
+                if d['status'] == 'started':
+                    progress.finish_stage("download")
+                    progress.update("merge", 0.0)
+                elif d['status'] == 'finished':
+                    progress.finish_stage("merge")
+            _yt_dlp_download(handle, {
                 'format': format_str,
                 'outtmpl': temp_template,
                 'noplaylist': True,
                 'merge_output_format': 'mp4',
-                'postprocessor_args': ['-c:a', 'aac'],  # 強制使用 aac 音訊編碼
-            }
+                'progress_hooks': [_yt_dlp_progress_hook(progress)],
+                'postprocessor_hooks': [merge_timing_hook(), merger_hook],
+            })
+            output_path = os.path.join(work_dir, f"temp_download_{temp_id}.mp4")
+            job.update(action="publish", filename=safe_title + ".mp4", inputs=[output_path], output=output_path)
+            return job
+
         elif file_format == 'mp3':
-            temp_template = os.path.join(download_path, f"temp_download_{temp_id}.%(ext)s")
-            # 嘗試解析用戶選擇的位元率
-            selected_bitrate = None
-            try:
-                selected_bitrate = int(resolution.replace("kbps", "").strip())
-            except Exception:
-                pass
+            selected_bitrate = _parse_bitrate(resolution)
             if selected_bitrate is not None:
                 format_str = f"bestaudio[abr={selected_bitrate}]/bestaudio/best"
-                preferred_quality = str(selected_bitrate)
             else:
                 format_str = "bestaudio/best"
-                preferred_quality = str(selected_bitrate)
-            ydl_opts = {
+            # 只下載原始音訊，轉成 mp3 交給 CPU 階段
+            progress.add_download_stage("download")
+            progress.add_processing_stage("encode", stream_copy=False)
+            audio_path = _yt_dlp_download(handle, {
                 'format': format_str,
-                'outtmpl': temp_template,
+                'outtmpl': os.path.join(work_dir, f"audio_{temp_id}.%(ext)s"),
                 'noplaylist': True,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': preferred_quality,
-                }],
-            }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-        if file_format == 'mp4':
-            output_ext = 'mp4'
-        else:
-            output_ext = 'mp3'
-        # 取得 yt_dlp 回傳的影片標題
-        raw_title = info['title']
-        # 利用自訂函式先清理標題，再產生唯一檔案名稱
-        safe_title = sanitize_filename(raw_title)
-        filename = safe_title + f".{output_ext}"
-        unique_filename = generate_new_filename(download_path, filename)
-        final_filepath = os.path.join(download_path, unique_filename)
-        # 取得暫存檔案的完整路徑
-        temp_filepath = os.path.join(download_path, f"temp_download_{temp_id}.{output_ext}")
-        # 重新命名暫存檔案
-        os.rename(temp_filepath, final_filepath)
-        
-        return final_filepath
-    
-@timeit
-def merge_video_audio(video_path, audio_path, output_path):
-    """使用 FFmpeg 合併影片和音訊"""
-    ffmpeg_path = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')  # 指定 ffmpeg 的完整路徑
-    ffmpeg_command = [
-        ffmpeg_path, '-i', video_path, '-i', audio_path, '-c:v', 'copy', '-c:a', 'aac', '-strict', 'experimental', output_path
-    ]
-    
-    process = subprocess.Popen(
-    ffmpeg_command,
-    stdout=subprocess.DEVNULL,
-    stderr=subprocess.DEVNULL,
-    creationflags=subprocess.CREATE_NO_WINDOW
-    )
-    process.wait()
-    logger.info(f"合併完成！")
\ No newline at end of file
+                'progress_hooks': [_yt_dlp_progress_hook(progress)],
+            })
+            job.update(action="mp3", filename=safe_title + ".mp3", bitrate=selected_bitrate,
+                       inputs=[audio_path], output=os.path.join(work_dir, "output.mp3"))
+            return job
+
+    raise ValueError(f"Unsupported downloader/format: {downloader}/{file_format}")
+
+def finish_playlist_item(job, progress=None):
+    """
+    下載播放清單單一影片的 CPU 階段：依 fetch_playlist_item 的工作描述執行 ffmpeg，
+    再將成品發佈到下載目錄並清除暫存目錄，回傳最終路徑。
+    progress 為網路階段使用的 JobProgress（從合併階段續做的工作沒有下載階段），合併/轉檔進度依 ffmpeg 回報的媒體時間更新。
+    action 為 "archived" 時代表網路階段已確認下載紀錄中的檔案完好，直接回傳既有路徑。
+    """
+    if job["action"] == "archived":
+        return job["output"]
+    temp_id = job["temp_id"]
+    if progress is None:
+        progress = JobProgress(temp_id)
+    if job["action"] == "merge":
+        logger.info(f"{temp_id} 正在合併影片與音訊...")
+        if "merge" not in progress.stages:
+            progress.add_processing_stage("merge")
+        merge_video_audio(job["inputs"][0], job["inputs"][1], job["output"],
+                          lambda fraction: progress.update("merge", fraction), 0.0, 1.0)
+    elif job["action"] == "mp3":
+        logger.info(f"{temp_id} 正在轉換音訊格式...")
+        if "encode" not in progress.stages:
+            progress.add_processing_stage("encode", stream_copy=False)
+        returncode = run_ffmpeg(_mp3_command(job["inputs"][0], job["output"], job.get("bitrate")),
+                                lambda fraction: progress.update("encode", fraction))
+        if returncode != 0:
+            raise RuntimeError(f"{temp_id} ffmpeg mp3 conversion failed with exit code {returncode}")
+    # 於下載目錄配置不重複的檔名，並將暫存檔案原子地發佈過去
+    output_path = scratch_area.publish_unique(job["output"], job["download_path"], job["filename"])
+    logger.info(f"{temp_id} 清理暫存檔案...")
+    scratch_area.release(job["work_dir"])
+    # 記錄到下載紀錄，下次遇到同一影片/格式/解析度時可直接跳過
+    try:
+        download_archive.record(job["url"], job["format"], job["resolution"], output_path, job.get("title"))
+    except Exception as e:
+        logger.warning(f"{temp_id} Failed to record download archive entry: {e}")
+    progress.complete()
+    progress.log_summary()
+    return output_path
@@ -1,10 +1,9 @@
 import os
-import re
 import time
 import functools
 import subprocess
 from logging_config import setup_logger, log_and_show_error
-from rich import print
+from filename_allocator import filename_allocator
 
 # ------------------------------
 # 初始化 Logger
@@ -55,23 +54,34 @@ def time_to_seconds(time_str):
             return int(parts[0]) * 60 + float(parts[1])
         else:
             return float(time_str)
-    except Exception as e:
+    except Exception:
         return 0.0
 
 def get_unique_filename(path):
     """
-    若檔案存在，則自動加上 (1)、(2) … 的後綴
+    若檔案存在，則自動加上 (1)、(2) … 的後綴。
+    名稱由 filename_allocator 配置並建立佔位檔，ffmpeg 需加上 -y 覆寫。
     """
-    base, ext = os.path.splitext(path)
-    counter = 1
-    new_path = path
-    while os.path.exists(new_path):
-        new_path = f"{base} ({counter}){ext}"
-        counter += 1
-    return new_path
+    return filename_allocator.allocate(*os.path.split(path))
+
+def unique_output(func):
+    """
+    為轉檔函式配置不重複的輸出檔（輸入檔名加上 _converted），以 output_path 參數傳入。
+    轉檔拋出例外或 ffmpeg 失敗時刪除輸出檔（含空的佔位檔與寫到一半的內容），並釋放該檔名。
+    """
+    @functools.wraps(func)
+    def wrapper(input_path, param, target_format, *args, **kwargs):
+        output_path = get_unique_filename(os.path.splitext(input_path)[0] + f"_converted.{target_format}")
+        try:
+            return func(input_path, param, target_format, *args, output_path=output_path, **kwargs)
+        except BaseException:
+            filename_allocator.release(output_path, discard=True)
+            raise
+    return wrapper
 
 @timeit
-def convert_video(input_path, resolution, target_format, start_time, duration, video_transcoder="Default", audio_transcoder="Default", progress_callback=None):
+@unique_output
+def convert_video(input_path, resolution, target_format, start_time, duration, video_transcoder="Default", audio_transcoder="Default", progress_callback=None, *, output_path):
     """
     input_path: 輸入檔案路徑
     resolution: 若為 "Original resolution" 則不進行縮放
@@ -80,12 +90,10 @@ def convert_video(input_path, resolution, target_format, start_time, duration, v
     duration: 剪輯持續時間，單位秒（已由 main.py 計算好）
     video_transcoder / audio_transcoder: 若非 "Default" 則加入對應 ffmpeg 參數
     progress_callback: 回呼函式，傳入 0~1 之間的進度值
+    output_path: 由 unique_output 配置的輸出檔路徑
     """
-    base_output = os.path.splitext(input_path)[0] + f"_converted.{target_format}"
-    output_path = get_unique_filename(base_output)
-
     ffmpeg_path = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')
-    command = [ffmpeg_path]
+    command = [ffmpeg_path, "-y"]
     if start_time and start_time != "00:00:00":
         command.extend(["-ss", start_time])
     command.extend(["-i", input_path])
@@ -140,12 +148,14 @@ def convert_video(input_path, resolution, target_format, start_time, duration, v
                 if progress_callback:
                     progress_callback(1.0)
                 break
-    process.wait()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg conversion failed with exit code {process.returncode}")
     return output_path
 
 
 @timeit
-def convert_audio(input_path, bitrate, target_format, start_time, duration, progress_callback=None):
+@unique_output
+def convert_audio(input_path, bitrate, target_format, start_time, duration, progress_callback=None, *, output_path):
     """
     input_path: 輸入檔案路徑
     bitrate: 使用者指定的位元率（例如 "128kbps"）
@@ -153,13 +163,10 @@ def convert_audio(input_path, bitrate, target_format, start_time, duration, prog
     start_time: 剪輯起始時間（格式 "HH:MM:SS"）
     duration: 剪輯持續時間（以秒計），可由 main.py 計算得出
     progress_callback: 回呼函式，傳入 0~1 之間的進度數值
+    output_path: 由 unique_output 配置的輸出檔路徑
     """
-    # 產生初步 output 路徑，再檢查是否衝突
-    base_output = os.path.splitext(input_path)[0] + f"_converted.{target_format}"
-    output_path = get_unique_filename(base_output)
-    
     ffmpeg_path = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')
-    command = [ffmpeg_path]
+    command = [ffmpeg_path, "-y"]
     
     if start_time and start_time != "00:00:00":
         command.extend(["-ss", start_time])
@@ -178,7 +185,7 @@ def convert_audio(input_path, bitrate, target_format, start_time, duration, prog
             khz_value = float(bitrate.lower().replace("khz", "").strip())
             sample_rate = int(khz_value * 1000)
             command.extend(["-ar", str(sample_rate)])
-        except Exception as e:
+        except Exception:
             pass
     elif target_format.lower() == "flac":
         # flac 使用預設壓縮參數，不設定 bitrate
@@ -225,5 +232,6 @@ def convert_audio(input_path, bitrate, target_format, start_time, duration, prog
             if progress_callback:
                 progress_callback(1.0)
             break
-    process.wait()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg conversion failed with exit code {process.returncode}")
     return output_path
\ No newline at end of file
@@ -0,0 +1,115 @@
+import time
+import threading
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+DEFAULT_INTERVAL = 10.0      # 每個量測窗的秒數
+MIN_GAIN = 1.05              # 增加同時下載數後，吞吐量至少要提升 5% 才繼續往上加
+ERROR_RATE_LIMIT = 0.2       # 量測窗內失敗比例超過此值時減少一個同時下載數
+
+def is_throttle_error(error):
+    """
+    判斷錯誤是否為伺服器限流（HTTP 429 Too Many Requests）。
+    只比對狀態碼屬性與明確的訊息字串，訊息中的位元組位置、影片 ID 等含有 429 的數字不算。
+    """
+    response = getattr(error, "response", None)
+    for source in (error, response):
+        for attr in ("code", "status", "status_code"):
+            if getattr(source, attr, None) == 429:
+                return True
+    message = str(error)
+    return "HTTP Error 429" in message or "Too Many Requests" in message
+
+class AdaptiveConcurrency:
+    """
+    以 AIMD 調整同時下載數：
+    - 量測窗內出現 429 限流：同時下載數減半（multiplicative decrease）
+    - 失敗比例過高：減一
+    - 所有下載名額都在使用中、且上一次增加後吞吐量確實提升：加一（additive increase）；
+      增加後吞吐量沒有提升代表頻寬已飽和，退回前一個數值
+    結果限制在 min_limit ~ max_limit 之間，由呼叫端定期呼叫 tick() 取得新數值。
+    """
+    def __init__(self, min_limit=1, max_limit=12, initial=4, interval=DEFAULT_INTERVAL):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = self._clamp(initial)
+        self.interval = interval
+        self.throughput = 0.0  # 最近一個量測窗的吞吐量（bytes/s）
+        self._lock = threading.Lock()
+        self._window_start = time.perf_counter()
+        self._bytes = 0
+        self._completed = 0
+        self._errors = 0
+        self._throttled = 0
+        self._saturated_ticks = 0
+        self._ticks = 0
+        self._previous = None  # 上一個量測窗的 (同時下載數, 吞吐量)
+
+    def _clamp(self, value):
+        return min(max(int(value), self.min_limit), self.max_limit)
+
+    def record_success(self, nbytes):
+        with self._lock:
+            self._bytes += nbytes
+            self._completed += 1
+
+    def record_error(self, error):
+        with self._lock:
+            self._errors += 1
+            if is_throttle_error(error):
+                self._throttled += 1
+
+    def tick(self, busy):
+        """
+        定期呼叫（例如每 0.2 秒），busy 為目前正在下載的項目數。
+        量測窗結束時依吞吐量與錯誤調整同時下載數，回傳新的數值；否則回傳 None。
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self._ticks += 1
+            if busy >= self.limit:
+                self._saturated_ticks += 1
+            elapsed = now - self._window_start
+            if elapsed < self.interval:
+                return None
+            throughput = self._bytes / elapsed
+            completed, errors, throttled = self._completed, self._errors, self._throttled
+            saturated = self._saturated_ticks >= self._ticks / 2
+            self._window_start = now
+            self._bytes = self._completed = self._errors = self._throttled = 0
+            self._saturated_ticks = self._ticks = 0
+
+            old_limit = self.limit
+            if throttled:
+                self.limit = self._clamp(self.limit // 2)
+                reason = f"{throttled} throttled responses"
+            elif errors and errors / (errors + completed) > ERROR_RATE_LIMIT:
+                self.limit = self._clamp(self.limit - 1)
+                reason = f"error rate {errors}/{errors + completed}"
+            elif completed == 0:
+                # 量測窗內沒有項目完成（例如單一大檔仍在下載），不足以判斷
+                return None
+            elif not saturated:
+                reason = "not all slots in use"
+            elif (self._previous is not None and self._previous[0] < self.limit
+                  and throughput < self._previous[1] * MIN_GAIN):
+                # 增加後吞吐量沒有提升：頻寬已飽和，退回上一個數值
+                self.limit = self._clamp(self.limit - 1)
+                reason = "no gain from the last increase"
+            else:
+                self.limit = self._clamp(self.limit + 1)
+                reason = "throughput still scaling"
+            self.throughput = throughput
+            self._previous = (old_limit, throughput)
+            if self.limit != old_limit:
+                logger.info(f"Concurrency {old_limit} -> {self.limit} ({reason}, "
+                            f"{throughput / (1024 * 1024):.2f} MB/s)")
+            return self.limit
+
+    def snapshot(self):
+        with self._lock:
+            return {"limit": self.limit, "throughput_mbps": self.throughput / (1024 * 1024)}
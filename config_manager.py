@@ -7,7 +7,27 @@ DEFAULT_CONFIG = {
     "language": "zh",
     "resolution": "1280x720",
     "download_path": os.getcwd(),
-    "ad_image": ""
+    "ad_image": "",
+    "info_cache_ttl": 21600,
+    "info_cache_max_entries": 500,
+    "thumbnail_cache_max_mb": 50,
+    "download_connections": 4,
+    "download_chunk_mb": 8,
+    "progress_fps": 25,
+    "scratch_dir": "",
+    "scratch_max_age_hours": 168,
+    "ydl_pool_size": 4,
+    "playlist_title_workers": 8,
+    "playlist_title_timeout": 15,
+    "download_concurrency_min": 1,
+    "download_concurrency_max": 12,
+    "download_concurrency_hint": 4,
+    "pipeline_cpu_workers": 2,
+    "pipeline_queue_size": 4,
+    "download_archive_mode": "skip",
+    "download_archive_file": "download_archive.sqlite3",
+    "job_queue_file": "job_queue.sqlite3",
+    "job_max_attempts": 3
 }
 
 def load_config():
@@ -0,0 +1,147 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from logging_config import setup_logger
+from info_cache import extract_video_id
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+ARCHIVE_FILE = "download_archive.sqlite3"
+# skip：檔案仍存在且大小相符即跳過；verify：另外比對 SHA-256，內容損毀時重新下載；off：不查詢紀錄
+ARCHIVE_MODES = ("skip", "verify", "off")
+HASH_CHUNK = 1024 * 1024
+
+def file_digest(path):
+    """以 SHA-256 計算檔案內容的雜湊值"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DownloadArchive:
+    """
+    已完成下載的紀錄，存於本機 SQLite。
+    以 (影片 ID, 檔案格式, 解析度/位元率) 為主鍵，記錄輸出路徑、大小與 SHA-256（只在 verify 模式計算，否則為空字串），
+    重新下載同一播放清單時以主鍵查詢（O(1)），已完成且檔案完好的項目直接跳過，
+    不再重複下載成 "Title (1).mp4"。
+    """
+    def __init__(self, path=ARCHIVE_FILE, mode="skip"):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def configure(self, path=None, mode=None):
+        with self._lock:
+            if path and path != self.path:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                self.path = path
+            if mode is not None:
+                if mode not in ARCHIVE_MODES:
+                    logger.warning(f"Unknown download archive mode {mode!r}, using 'skip'")
+                    mode = "skip"
+                self.mode = mode
+
+    def _connection(self):
+        """在持有 self._lock 時呼叫；第一次使用時才開啟資料庫"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS downloads (
+                    video_id TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    title TEXT,
+                    downloaded_at REAL NOT NULL,
+                    PRIMARY KEY (video_id, format, resolution)
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, url, file_format, resolution):
+        """回傳紀錄 dict（path、size、sha256、title），沒有紀錄時回傳 None"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT path, size, sha256, title FROM downloads WHERE video_id = ? AND format = ? AND resolution = ?",
+                (extract_video_id(url), file_format, resolution)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"path": row[0], "size": row[1], "sha256": row[2], "title": row[3]}
+
+    def check(self, url, file_format, resolution):
+        """
+        依目前模式檢查項目是否已下載完成：完成且檔案完好時回傳既有路徑，需要下載時回傳 None。
+        檔案已不存在或內容損毀時移除該筆紀錄。verify 模式會讀取整個檔案，應在下載執行緒中呼叫。
+        """
+        if self.mode == "off":
+            return None
+        record = self.lookup(url, file_format, resolution)
+        if record is None:
+            return None
+        path = record["path"]
+        reason = None
+        try:
+            if os.path.getsize(path) != record["size"]:
+                reason = "size mismatch"
+            elif self.mode == "verify":
+                digest = file_digest(path)
+                if not record["sha256"]:
+                    # skip 模式下記錄的項目沒有雜湊值：大小相符即視為完好，補上雜湊值供之後比對
+                    self._update_digest(url, file_format, resolution, digest)
+                elif digest != record["sha256"]:
+                    reason = "hash mismatch"
+        except OSError:
+            reason = "file missing"
+        if reason:
+            logger.info(f"Archived download of {url} is invalid ({reason}), downloading again")
+            self.forget(url, file_format, resolution)
+            return None
+        return path
+
+    def record(self, url, file_format, resolution, path, title=None):
+        """記錄一筆完成的下載（同鍵的舊紀錄會被取代）；只有 verify 模式會讀取整個檔案計算雜湊值"""
+        size = os.path.getsize(path)
+        digest = file_digest(path) if self.mode == "verify" else ""
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (extract_video_id(url), file_format, resolution, path, size, digest, title, time.time())
+            )
+            conn.commit()
+
+    def _update_digest(self, url, file_format, resolution, digest):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE downloads SET sha256 = ? WHERE video_id = ? AND format = ? AND resolution = ?",
+                         (digest, extract_video_id(url), file_format, resolution))
+            conn.commit()
+
+    def forget(self, url, file_format, resolution):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM downloads WHERE video_id = ? AND format = ? AND resolution = ?",
+                         (extract_video_id(url), file_format, resolution))
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+download_archive = DownloadArchive()
@@ -0,0 +1,80 @@
+import os
+import threading
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+class _DirectoryIndex:
+    """單一目錄的檔名索引：以一次 scandir 載入，之後配置的名稱也會加入"""
+    def __init__(self, directory):
+        self.names = set()
+        self.next_suffix = {}  # (base, ext) -> 下一個要嘗試的 (n) 後綴
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    self.names.add(os.path.normcase(entry.name))
+        except FileNotFoundError:
+            pass
+
+class FilenameAllocator:
+    """
+    產生不重複的輸出檔名（name.mp4、name (1).mp4、name (2).mp4 …）。
+    每個目錄只在第一次使用時 scandir 一次，之後於記憶體中查詢並記住各檔名下一個可用的後綴，
+    不必每次逐一 os.path.exists 試探。選定名稱後以 O_EXCL 建立空的佔位檔，
+    即使多個 worker 同時完成同名影片、或其他程式剛好建立同名檔案，也不會拿到相同的檔名。
+    佔位檔之後由 os.replace 或 ffmpeg -y 直接覆寫成正式檔案。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def allocate(self, directory, filename):
+        """保留 directory 中不重複的檔名並回傳完整路徑"""
+        base, ext = os.path.splitext(filename)
+        key = (os.path.normcase(base), os.path.normcase(ext))
+        with self._lock:
+            index = self._indexes.get(os.path.abspath(directory))
+            if index is None:
+                index = self._indexes[os.path.abspath(directory)] = _DirectoryIndex(directory)
+            counter = index.next_suffix.get(key, 0)
+            while True:
+                candidate = filename if counter == 0 else f"{base} ({counter}){ext}"
+                counter += 1
+                name_key = os.path.normcase(candidate)
+                if name_key in index.names:
+                    continue
+                path = os.path.join(directory, candidate)
+                try:
+                    os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                except FileExistsError:
+                    # 索引建立後才出現的檔案（例如其他程式建立），記錄後繼續找下一個
+                    index.names.add(name_key)
+                    continue
+                index.names.add(name_key)
+                index.next_suffix[key] = counter
+                return path
+
+    def release(self, path, discard=False):
+        """
+        工作失敗時移除尚未寫入內容的佔位檔，並讓該名稱可再次配置。
+        discard 為 True 時即使已寫入內容也一併刪除（例如轉檔失敗留下寫到一半的輸出檔）。
+        """
+        try:
+            if not discard and os.path.getsize(path) != 0:
+                return
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Failed to release placeholder {path}: {e}")
+            return
+        directory, filename = os.path.split(path)
+        with self._lock:
+            index = self._indexes.get(os.path.abspath(directory))
+            if index is not None:
+                index.names.discard(os.path.normcase(filename))
+                # 釋放的名稱可能是 (n) 後綴之一，下次從頭在記憶體中尋找
+                index.next_suffix.clear()
+
+filename_allocator = FilenameAllocator()
@@ -0,0 +1,178 @@
+import re
+from logging_config import setup_logger
+from media_merge import can_copy
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+# 編碼字串前綴 -> ffprobe 使用的編碼名稱
+_CODEC_FAMILIES = [
+    ("avc", "h264"), ("h264", "h264"), ("hev", "hevc"), ("hvc", "hevc"),
+    ("vp09", "vp9"), ("vp9", "vp9"), ("vp8", "vp8"), ("av01", "av1"),
+    ("mp4a", "aac"), ("aac", "aac"), ("opus", "opus"), ("vorbis", "vorbis"), ("mp3", "mp3"),
+]
+
+# 各容器的編碼偏好（越前面越相容），僅用於能直接封裝的候選之間排序
+CODEC_PREFERENCE = {
+    "mp4": {"video": ["h264", "av1", "vp9", "hevc"], "audio": ["aac", "mp3"]},
+    "webm": {"video": ["vp9", "av1", "vp8"], "audio": ["opus", "vorbis"]},
+    "mkv": {"video": ["vp9", "av1", "h264", "hevc"], "audio": ["opus", "aac", "vorbis"]},
+}
+
+def codec_family(codec):
+    """將 avc1.640028、vp09.00.51.08、mp4a.40.2 等字串轉為 h264、vp9、aac"""
+    if not codec or codec == "none":
+        return None
+    codec = codec.lower()
+    for prefix, family in _CODEC_FAMILIES:
+        if codec.startswith(prefix):
+            return family
+    return codec.split(".")[0]
+
+def parse_target_height(resolution):
+    """接受 "1920x1080" 或 "1080p"，回傳目標高度；無法解析時回傳 None"""
+    match = re.match(r'^\s*(\d+)\s*x\s*(\d+)\s*$', resolution or "")
+    if match:
+        return int(match.group(2))
+    match = re.match(r'^\s*(\d+)p', resolution or "")
+    return int(match.group(1)) if match else None
+
+class FormatOption:
+    """下載器無關的格式描述"""
+    def __init__(self, format_id, vcodec, acodec, width, height, filesize, bitrate, fps, source):
+        self.format_id = format_id
+        self.vcodec = codec_family(vcodec)
+        self.acodec = codec_family(acodec)
+        self.width = width or 0
+        self.height = height or 0
+        self.filesize = filesize or 0
+        self.bitrate = bitrate or 0
+        self.fps = fps or 0
+        self.source = source  # 原始的 yt_dlp format dict 或 pytubefix Stream
+
+    @property
+    def is_video_only(self):
+        return self.vcodec is not None and self.acodec is None
+
+    @property
+    def is_audio_only(self):
+        return self.vcodec is None and self.acodec is not None
+
+    def describe(self):
+        if self.is_audio_only:
+            return f"{self.format_id}:{self.acodec}@{self.bitrate:.0f}k"
+        return f"{self.format_id}:{self.width}x{self.height} {self.vcodec}"
+
+class Selection:
+    """選擇結果：影片格式、音訊格式（單一檔案時為 None）、是否需要轉碼與選擇理由"""
+    def __init__(self, video, audio, needs_reencode, reason):
+        self.video = video
+        self.audio = audio
+        self.needs_reencode = needs_reencode
+        self.reason = reason
+
+    @property
+    def yt_dlp_format(self):
+        if self.audio is None:
+            return str(self.video.format_id)
+        return f"{self.video.format_id}+{self.audio.format_id}"
+
+def options_from_yt_dlp(formats):
+    options = []
+    for fmt in formats:
+        if fmt.get("vcodec") in (None, "none") and fmt.get("acodec") in (None, "none"):
+            continue  # 例如 storyboard 圖片
+        options.append(FormatOption(
+            fmt.get("format_id"), fmt.get("vcodec"), fmt.get("acodec"),
+            fmt.get("width"), fmt.get("height"),
+            fmt.get("filesize") or fmt.get("filesize_approx"),
+            fmt.get("abr") if fmt.get("vcodec") in (None, "none") else fmt.get("tbr"),
+            fmt.get("fps"), fmt
+        ))
+    return options
+
+def options_from_pytubefix(streams):
+    options = []
+    for stream in streams:
+        height = None
+        if stream.includes_video_track:
+            height = stream.height or parse_target_height(stream.resolution)
+        options.append(FormatOption(
+            stream.itag, stream.video_codec, stream.audio_codec,
+            stream.width, height, stream.filesize_approx,
+            (stream.bitrate or 0) / 1000, getattr(stream, "fps", None), stream
+        ))
+    return options
+
+def _rank(codec, container, codec_type):
+    preference = CODEC_PREFERENCE.get(container, {}).get(codec_type, [])
+    return preference.index(codec) if codec in preference else len(preference)
+
+def _height_distance(height, target):
+    """與目標高度的距離；低於目標優先於高於目標"""
+    if target is None:
+        return (0, -height)
+    if height == target:
+        return (0, 0)
+    if height < target:
+        return (1, target - height)
+    return (2, height - target)
+
+def select_formats(options, resolution, container="mp4"):
+    """
+    依解析度符合程度、編碼與容器相容性（能否直接封裝）與檔案大小為格式評分，
+    同解析度下優先選不需轉碼的組合。回傳最佳的 Selection；找不到任何影片格式時回傳 None。
+    """
+    target = parse_target_height(resolution)
+    video_options = [o for o in options if o.vcodec is not None]
+    audio_options = [o for o in options if o.is_audio_only]
+    if not video_options:
+        return None
+
+    # 音訊：可直接封裝優先，其次編碼偏好，再來位元率高者
+    best_audio = None
+    if audio_options:
+        best_audio = min(audio_options, key=lambda o: (
+            not can_copy(o.acodec, container, "audio"),
+            _rank(o.acodec, container, "audio"),
+            -o.bitrate
+        ))
+
+    def video_key(option):
+        audio = None if option.acodec else best_audio
+        copy_ok = can_copy(option.vcodec, container, "video") and (
+            can_copy(option.acodec or (audio.acodec if audio else None), container, "audio"))
+        return (
+            _height_distance(option.height, target),
+            not copy_ok,
+            option.acodec is not None,  # 同條件下優先選分離串流（畫質較高）
+            _rank(option.vcodec, container, "video"),
+            -option.fps,
+            option.filesize,
+        )
+
+    video = min(video_options, key=video_key)
+    audio = None if video.acodec else best_audio
+    if video.is_video_only and audio is None:
+        return None
+    needs_reencode = video_key(video)[1]
+
+    if video.height == target:
+        match = f"{video.height}p exact match"
+    else:
+        match = f"{video.height}p closest to {target}p" if target else f"{video.height}p highest"
+    codecs = f"{video.vcodec}+{audio.acodec if audio else video.acodec}"
+    size_mb = (video.filesize + (audio.filesize if audio else 0)) / (1024 * 1024)
+    reason = (f"{match}; {codecs} -> {container} "
+              f"{'needs re-encode' if needs_reencode else 'stream copy'}; ~{size_mb:.1f} MB")
+    return Selection(video, audio, needs_reencode, reason)
+
+def log_selection(job, selection):
+    """記錄每個工作選到的格式與理由"""
+    if selection is None:
+        logger.info(f"{job}: no format matched, falling back to downloader defaults")
+        return
+    chosen = selection.video.describe() + (f" + {selection.audio.describe()}" if selection.audio else "")
+    logger.info(f"{job}: selected {chosen} ({selection.reason})")
@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+CACHE_FILE = "video_info_cache.json"
+DEFAULT_TTL = 6 * 3600       # 快取有效時間（秒）
+DEFAULT_MAX_ENTRIES = 500    # 快取最多保留筆數，超過時淘汰最久未使用者
+
+# 支援 watch?v=、youtu.be/、shorts/、embed/、live/ 等網址形式
+_VIDEO_ID_PATTERN = re.compile(r'(?:v=|youtu\.be/|shorts/|embed/|live/)([0-9A-Za-z_-]{11})')
+
+def extract_video_id(url):
+    """從 YouTube 網址取出 11 碼影片 ID，無法辨識時回傳原始網址"""
+    match = _VIDEO_ID_PATTERN.search(url or "")
+    return match.group(1) if match else (url or "").strip()
+
+class VideoInfoCache:
+    """
+    影片資訊快取，以 (影片 ID, 下載器, 檔案格式) 為鍵，
+    保存標題、封面 URL、可用畫質與字幕。
+    資料存於記憶體並同步寫入磁碟，具備 TTL 過期與 LRU 淘汰機制。
+    """
+    def __init__(self, cache_file=CACHE_FILE, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def configure(self, ttl=None, max_entries=None):
+        """依設定檔調整 TTL 與容量上限"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self._evict()
+
+    @staticmethod
+    def make_key(url, downloader, file_format):
+        return f"{extract_video_id(url)}|{downloader}|{file_format}"
+
+    def get(self, url, downloader, file_format):
+        """取得快取資料，過期或不存在時回傳 None"""
+        key = self.make_key(url, downloader, file_format)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created_at"] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["title"], entry["thumbnail_url"], list(entry["resolutions"]), list(entry["subtitles"])
+
+    def put(self, url, downloader, file_format, title, thumbnail_url, resolutions, subtitles):
+        key = self.make_key(url, downloader, file_format)
+        with self._lock:
+            self._entries[key] = {
+                "title": title,
+                "thumbnail_url": thumbnail_url,
+                "resolutions": list(resolutions),
+                "subtitles": list(subtitles),
+                "created_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def stats(self):
+        """回傳命中/未命中次數與目前筆數"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load video info cache: {e}")
+            return
+        now = time.time()
+        # 檔案內依使用順序排列（最舊在前），讀入時略過已過期資料
+        for key, entry in data.items():
+            if now - entry.get("created_at", 0) <= self.ttl:
+                self._entries[key] = entry
+        self._evict()
+
+    def _save(self):
+        # 先寫入暫存檔再取代，避免程式中斷時留下損毀的快取檔
+        temp_file = self.cache_file + ".tmp"
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to save video info cache: {e}")
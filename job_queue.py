@@ -0,0 +1,164 @@
+import json
+import time
+import sqlite3
+import threading
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+JOB_QUEUE_FILE = "job_queue.sqlite3"
+# 狀態流程：queued -> downloading -> merging -> done，任一階段失敗為 failed
+QUEUED, DOWNLOADING, MERGING, DONE, FAILED = "queued", "downloading", "merging", "done", "failed"
+DEFAULT_MAX_ATTEMPTS = 3
+
+class JobQueue:
+    """
+    播放清單下載工作的持久化佇列，存於 SQLite（WAL 模式，每次狀態變更即提交）。
+    每筆記錄影片資料、狀態、嘗試次數與已完成階段的產物（網路階段下載到暫存區的檔案），
+    程式中斷後重新啟動時可還原未完成的工作：已下載完成的項目直接從合併階段繼續，不必重新下載。
+    """
+    def __init__(self, path=JOB_QUEUE_FILE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def configure(self, path=None, max_attempts=None):
+        with self._lock:
+            if path and path != self.path:
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                self.path = path
+            if max_attempts is not None:
+                self.max_attempts = max(1, max_attempts)
+
+    def _connection(self):
+        """在持有 self._lock 時呼叫；第一次使用時才開啟資料庫"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL 模式下 NORMAL 即可確保程式當機時資料庫不會損毀
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    resolution TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    downloader TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    artifacts TEXT,
+                    output TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+            self._conn.commit()
+        return self._conn
+
+    def enqueue_many(self, items, downloader):
+        """以單一交易加入多筆工作，並將工作代號寫回各 item 的 "job_id" """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for item in items:
+                    cursor = conn.execute(
+                        "INSERT INTO jobs (url, title, resolution, format, downloader, state, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (item["url"], item.get("title"), item["resolution"], item["format"], downloader, QUEUED, now)
+                    )
+                    item["job_id"] = cursor.lastrowid
+                    item["downloader"] = downloader
+
+    def mark(self, job_id, state, artifacts=None, output=None, error=None):
+        """
+        更新工作狀態。進入 downloading 時嘗試次數加一；
+        artifacts 為網路階段的產物（fetch_playlist_item 回傳的工作描述），進入 merging 時記錄。
+        """
+        if job_id is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + ?, "
+                    "artifacts = COALESCE(?, artifacts), output = COALESCE(?, output), error = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (state, 1 if state == DOWNLOADING else 0,
+                     json.dumps(artifacts, ensure_ascii=False) if artifacts is not None else None,
+                     output, error, time.time(), job_id)
+                )
+
+    def update_title(self, job_id, title):
+        if job_id is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("UPDATE jobs SET title = ? WHERE id = ?", (title, job_id))
+
+    def remove(self, job_ids):
+        job_ids = [job_id for job_id in job_ids if job_id is not None]
+        if not job_ids:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def unfinished(self):
+        """
+        回傳尚未完成的工作（依加入順序），每筆為 dict。
+        失敗的工作在嘗試次數未達上限前視為未完成，會再次嘗試；
+        中斷於 downloading/merging 的工作若已達上限（例如每次都讓程式當掉）則標記為 failed，不再還原。
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, updated_at = ? "
+                    "WHERE state IN (?, ?) AND attempts >= ?",
+                    (FAILED, "Interrupted too many times", time.time(), DOWNLOADING, MERGING, self.max_attempts)
+                )
+            if cursor.rowcount:
+                logger.warning(f"Marked {cursor.rowcount} interrupted jobs as failed after {self.max_attempts} attempts")
+            rows = conn.execute(
+                "SELECT id, url, title, resolution, format, downloader, state, attempts, artifacts FROM jobs "
+                "WHERE state IN (?, ?, ?) OR (state = ? AND attempts < ?) ORDER BY id",
+                (QUEUED, DOWNLOADING, MERGING, FAILED, self.max_attempts)
+            ).fetchall()
+        jobs = []
+        for job_id, url, title, resolution, file_format, downloader, state, attempts, artifacts in rows:
+            jobs.append({
+                "job_id": job_id, "url": url, "title": title or "Unknown", "resolution": resolution,
+                "format": file_format, "downloader": downloader, "state": state, "attempts": attempts,
+                "artifacts": json.loads(artifacts) if artifacts else None,
+            })
+        return jobs
+
+    def purge_finished(self):
+        """移除已完成與已放棄的工作，回傳移除筆數"""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute("DELETE FROM jobs WHERE state = ? OR (state = ? AND attempts >= ?)",
+                                      (DONE, FAILED, self.max_attempts))
+        if cursor.rowcount:
+            logger.info(f"Purged {cursor.rowcount} finished jobs from {self.path}")
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+job_queue = JobQueue()
@@ -4,27 +4,38 @@ ver2.0
 
 import customtkinter as ctk
 from customtkinter import CTkImage
-from tkinter import filedialog, messagebox
-from PIL import Image, ImageOps
-import requests
+from tkinter import filedialog
 import threading
-import io
 import os
-from CTkTable import CTkTable
+import time
 from logging_config import setup_logger, log_and_show_error
-from Page1 import get_video_info, download_video_audio
-from Page2 import parse_playlist, download_video_audio_playlist
+from Page1 import get_video_info, download_video_audio, video_info_cache
+from Page2 import iter_playlist, fetch_playlist_item, finish_playlist_item, enrich_playlist_item, archived_playlist_item, configure_title_resolution
 from Page3 import convert_video, convert_audio, get_media_duration, time_to_seconds
 from config_manager import load_config, save_config
-from rich import print
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import subprocess
+from thumbnail_service import ThumbnailService
+from stream_download import configure_transfer
+from scratch import scratch_area
+from ydl_pool import ydl_pool
+from download_archive import download_archive
+from job_queue import job_queue, QUEUED, DOWNLOADING, MERGING, DONE, FAILED
+from progress_bus import ProgressBus, ProgressPump
+from progress_model import JobProgress, format_stats, format_job_status
+from virtual_table import VirtualTable, ListTableModel
+from pipeline import TwoStagePipeline, format_pipeline_stats
+from concurrency_controller import AdaptiveConcurrency
 
 # ------------------------------
 # 初始化 Logger
 # ------------------------------
 logger = setup_logger(__name__)
 
+# 播放清單邊讀取邊加入表格：每累積這麼多筆、或距上次更新超過這麼多秒，就送一批到主執行緒
+PLAYLIST_BATCH_SIZE = 25
+PLAYLIST_BATCH_INTERVAL = 0.2
+# 播放清單表格各欄寬度（像素）：標題、解析度、格式、URL、狀態（各工作的進度、速度與 ETA）
+PLAYLIST_COLUMN_WIDTHS = [300, 120, 80, 100, 200]
+
 # ------------------------------
 # 語言設定資料
 # ------------------------------     
@@ -34,7 +45,7 @@ LANGUAGES = {
         "setting_title": "設定",
         "theme_label": "主題",
         "language_label": "選擇語言",
-        "resolution_label": "視窗大小",
+        "window_size_label": "視窗大小",
         # HomePage
         "title_label": "Video DownloadErm",
         # Page1
@@ -57,6 +68,7 @@ LANGUAGES = {
         "resolution": "解析度",
         "format": "格式",
         "url": "影片網址",
+        "status": "狀態",
         # Page3
         "page3_title": "影音轉檔器",
         "select_files_label": "選擇檔案",
@@ -86,7 +98,7 @@ LANGUAGES = {
         "setting_title": "Setting",
         "theme_label": "Theme",
         "language_label": "Language",
-        "resolution_label": "Window Size",
+        "window_size_label": "Window Size",
         # HomePage
         "title_label": "Video DownloadErm",
         # Page1
@@ -109,6 +121,7 @@ LANGUAGES = {
         "resolution": "Resolution",
         "format": "Format",
         "url": "Video URL",
+        "status": "Status",
         # Pages 3
         "page3_title": "Media Converter",
         "select_files_label": "Select Files",
@@ -165,7 +178,7 @@ class Setting(ctk.CTkToplevel):
         self.language_combobox.grid(row=1, column=1, pady=10, sticky="ew")
         self.language_combobox.set(LANGUAGE_OPTIONS[self.master.config.get("language", "zh")])
         
-        self.resolution_label = ctk.CTkLabel(self, text=LANGUAGES[self.master.current_language]["resolution_label"])
+        self.resolution_label = ctk.CTkLabel(self, text=LANGUAGES[self.master.current_language]["window_size_label"])
         self.resolution_label.grid(row=2, column=0, pady=10, sticky="ew")
         self.resolution_combobox = ctk.CTkComboBox(self, values=["1920x1080", "1280x720"], command=self.change_resolution)
         self.resolution_combobox.grid(row=2, column=1, pady=10, sticky="ew")
@@ -209,14 +222,16 @@ class Setting(ctk.CTkToplevel):
             self.master.config["ad_image"] = file_path
             # 儲存設定到 JSON 檔案（假設 save_config 已定義）
             save_config(self.master.config)
-            # 更新廣告區畫面（會根據圖片自動等比例縮放）
-            self.master.frames[Page1].update_ad_area()
+            # 更新廣告區畫面（會根據圖片自動等比例縮放）；Page1 尚未建立時，建立時會自行讀取設定
+            page1 = self.master.frames.get(Page1)
+            if page1 is not None:
+                page1.update_ad_area()
 
     def update_text(self):
         self.title(LANGUAGES[self.master.current_language]["setting_title"])
         self.theme_label.configure(text=LANGUAGES[self.master.current_language]["theme_label"])
         self.language_label.configure(text=LANGUAGES[self.master.current_language]["language_label"])
-        self.resolution_label.configure(text=LANGUAGES[self.master.current_language]["resolution_label"])
+        self.resolution_label.configure(text=LANGUAGES[self.master.current_language]["window_size_label"])
 
 
 # ------------------------------
@@ -224,7 +239,8 @@ class Setting(ctk.CTkToplevel):
 # ------------------------------
 
 class MainApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, resume_jobs=True):
+        """resume_jobs: 啟動後是否還原上次未完成的工作（量測啟動時間等情況應設為 False，不動到佇列與暫存區）"""
         super().__init__()
         # 讀取設定檔
         self.config = load_config()
@@ -233,6 +249,34 @@ class MainApp(ctk.CTk):
         self.current_theme = self.config.get("theme", "Dark")
         resolution = self.config.get("resolution", "1280x720")
         self.download_path = self.config.get("download_path", os.getcwd())
+        video_info_cache.configure(
+            ttl=self.config.get("info_cache_ttl", 21600),
+            max_entries=self.config.get("info_cache_max_entries", 500)
+        )
+        self.thumbnail_service = ThumbnailService(
+            max_bytes=self.config.get("thumbnail_cache_max_mb", 50) * 1024 * 1024
+        )
+        configure_transfer(
+            connections=self.config.get("download_connections", 4),
+            chunk_size=self.config.get("download_chunk_mb", 8) * 1024 * 1024
+        )
+        # 暫存區可指向本機 SSD 或 RAM disk；首頁畫出後再清除上次留下且無法續傳的暫存檔
+        scratch_area.configure(self.config.get("scratch_dir") or None)
+        job_queue.configure(
+            path=self.config.get("job_queue_file", "job_queue.sqlite3"),
+            max_attempts=self.config.get("job_max_attempts", 3)
+        )
+        if resume_jobs:
+            self.after_idle(self.resume_jobs)
+        ydl_pool.configure(max_idle=self.config.get("ydl_pool_size", 4))
+        configure_title_resolution(
+            workers=self.config.get("playlist_title_workers", 8),
+            timeout=self.config.get("playlist_title_timeout", 15)
+        )
+        download_archive.configure(
+            path=self.config.get("download_archive_file", "download_archive.sqlite3"),
+            mode=self.config.get("download_archive_mode", "skip")
+        )
 
         ctk.set_appearance_mode(self.current_theme)
         self.title("Video DownloadErm")
@@ -244,17 +288,42 @@ class MainApp(ctk.CTk):
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
-        self.frames = {}
-        for Page in (HomePage, Page1, Page2, Page3, Page4):
-            page = Page(self)
-            self.frames[Page] = page
-            page.grid(row=0, column=0, sticky="nsew")
+        # 各頁面的進度由背景執行緒寫入 progress_bus，再由 progress_pump 以固定頻率更新 UI
+        self.progress_bus = ProgressBus()
+        self.progress_pump = ProgressPump(self, self.progress_bus, fps=self.config.get("progress_fps", 25))
 
+        # 頁面於第一次 show_frame 時才建立，啟動時只建立首頁
+        self.frames = {}
         self.show_frame(HomePage)
         self.setting_window = None
+        self.progress_pump.start()
+
+    def resume_jobs(self):
+        """首頁畫出後：清除暫存區中無用的檔案，並還原上次未完成的播放清單工作"""
+        job_queue.purge_finished()
+        jobs = job_queue.unfinished()
+        # 已下載、尚未合併的工作目錄需保留，還原後直接從合併階段繼續
+        scratch_area.cleanup_orphans(
+            self.config.get("scratch_max_age_hours", 168),
+            keep=[job["artifacts"]["work_dir"] for job in jobs if job["artifacts"]]
+        )
+        if jobs:
+            logger.info(f"Restoring {len(jobs)} unfinished playlist jobs")
+            self.get_frame(Page2).restore_jobs(jobs)
+
+    def get_frame(self, page):
+        """取得頁面實例，尚未建立時才建立並放入 grid"""
+        frame = self.frames.get(page)
+        if frame is None:
+            start = time.perf_counter()
+            frame = page(self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.frames[page] = frame
+            logger.info(f"Built {page.__name__} in {time.perf_counter() - start:.3f} seconds")
+        return frame
 
     def show_frame(self, page):
-        frame = self.frames[page]
+        frame = self.get_frame(page)
         frame.tkraise()
     
     def open_Setting(self):
@@ -271,7 +340,7 @@ class MainApp(ctk.CTk):
         if self.setting_window is not None and self.setting_window.winfo_exists():
             self.setting_window.update_text()
 
-        # 再來更新每一個 Page 的文字
+        # 再來更新每一個已建立 Page 的文字（尚未建立的頁面建立時會套用目前設定）
         for page_class, page_obj in self.frames.items():
             page_obj.update_text()
     
@@ -283,7 +352,7 @@ class MainApp(ctk.CTk):
         if self.setting_window is not None and self.setting_window.winfo_exists():
             self.setting_window.update_text()
 
-        # 再來更新每一個 Page 的文字
+        # 再來更新每一個已建立 Page 的文字（尚未建立的頁面建立時會套用目前設定）
         for page_class, page_obj in self.frames.items():
             page_obj.update_text()
 
@@ -352,6 +421,7 @@ class HomePage(ctk.CTkFrame):  # 主页
         icon_path = os.path.join(os.path.dirname(__file__), 'icon/icon_r.png')
         if icon_path and os.path.exists(icon_path):
             try:
+                from PIL import Image, ImageOps  # 延遲載入，縮短程式啟動時間
                 img = Image.open(icon_path)
                 # 使用 ImageOps.contain 使圖片在範圍內等比例縮放
                 img = ImageOps.contain(img, (360, 240))
@@ -380,6 +450,8 @@ class Page1(ctk.CTkFrame):
         
         self.download_path = self.master.config.get("download_path") or os.getcwd()
         self.video_url = ""
+        self.fetch_generation = 0  # 用來取代尚未完成的影片資訊查詢
+        self.video_handle = None  # get_video_info 的解析結果，下載時沿用
         
         # 設定 Grid 權重
         self.grid_columnconfigure(0, weight=7)
@@ -520,6 +592,7 @@ class Page1(ctk.CTkFrame):
         
         self.update_text() # 初始化文字
         self.update_ad_area() # 初始化廣告區
+        self.master.progress_pump.subscribe("page1", self.render_progress)
         
     def toggle_subtitle_combobox(self):
         if self.download_sub_var.get():
@@ -528,14 +601,50 @@ class Page1(ctk.CTkFrame):
             self.subtitle_combobox.grid_remove()  # 隱藏字幕下拉選單
 
     def fetch_video_info(self):
-        """獲取影片資訊並更新 UI"""
+        """在背景執行緒獲取影片資訊，結果透過 after() 回到主執行緒更新 UI"""
         url = self.url_entry.get()
         if not url:
             return
-        
+
         self.video_url = url
-        title, thumbnail_url, resolutions, subtitles = get_video_info(url, self.downloader_combobox.get(), self.format_var.get())
-        
+        self.video_handle = None
+        # 每次提交都遞增代號，舊的背景工作完成時若代號不符則直接丟棄結果
+        self.fetch_generation += 1
+        generation = self.fetch_generation
+        downloader = self.downloader_combobox.get()
+        file_format = self.format_var.get()
+        self.video_title_label.configure(text="...")
+
+        def is_current():
+            return generation == self.fetch_generation
+
+        def fetch_task():
+            try:
+                title, thumbnail_url, resolutions, subtitles, handle = get_video_info(url, downloader, file_format)
+            except Exception as e:
+                if is_current():
+                    log_and_show_error(f"Failed to get video info: {e}", self.master)
+                    self.master.after(0, lambda: self.video_title_label.configure(text="") if is_current() else None)
+                return
+            if not is_current():
+                return
+            self.master.after(0, lambda: self.apply_video_info(generation, title, resolutions, subtitles, handle))
+
+            if not thumbnail_url:
+                return
+
+            def on_thumbnail(img_data):
+                if img_data is not None and is_current():
+                    self.master.after(0, lambda: self.apply_thumbnail(generation, img_data))
+            self.master.thumbnail_service.submit(thumbnail_url, on_thumbnail)
+
+        threading.Thread(target=fetch_task, daemon=True).start()
+
+    def apply_video_info(self, generation, title, resolutions, subtitles, handle):
+        """於主執行緒更新標題、畫質與字幕選項，並保留解析結果供下載沿用"""
+        if generation != self.fetch_generation:
+            return
+        self.video_handle = handle
         self.video_title_label.configure(text=title)
         self.resolution_combobox.configure(values=resolutions)
         if resolutions:
@@ -546,29 +655,37 @@ class Page1(ctk.CTkFrame):
         # 更新字幕選項：若無字幕僅顯示 "No subtitle"，有的則加入各語系選項
         self.subtitle_combobox.configure(values=subtitles)
         self.subtitle_combobox.set(subtitles[0])
-        
-        # 更新封面圖
-        response = requests.get(thumbnail_url)
-        img_data = Image.open(io.BytesIO(response.content))
+
+    def apply_thumbnail(self, generation, img_data):
+        """於主執行緒更新封面圖"""
+        if generation != self.fetch_generation:
+            return
         self.thumbnail_image = CTkImage(light_image=img_data, dark_image=img_data, size=(400, 300))  # 這樣就能適應高DPI螢幕
         self.thumbnail_label.configure(image=self.thumbnail_image, text="")
 
-    def update_progress(self, progress):
+    def update_progress(self, progress, stats=None):
+        """可由任何執行緒呼叫，只將最新進度（與速度/ETA 統計）寫入 progress_bus"""
+        self.master.progress_bus.publish("page1", (progress, stats))
+
+    def render_progress(self, value):
+        """由 progress_pump 在主執行緒呼叫，更新進度條與文字"""
+        progress, stats = value
         lang = self.master.current_language
         if progress != -1:
             percent = int(progress * 100)
-            # 使用 after 確保 GUI 更新在主執行緒中執行
-            self.master.after(0, lambda: self.progress_bar.set(progress))
+            detail = format_stats(stats)
+            detail = f"  {detail}" if detail else ""
+            self.progress_bar.set(progress)
             if lang == "en":
-                self.master.after(0, lambda: self.progress_bar_label.configure(text=f"Processing: {percent}%"))
+                self.progress_bar_label.configure(text=f"Processing: {percent}%{detail}")
             elif lang == "zh":
-                self.master.after(0, lambda: self.progress_bar_label.configure(text=f"處理中: {percent}%"))
+                self.progress_bar_label.configure(text=f"處理中: {percent}%{detail}")
         else:
-            self.master.after(100, lambda: self.progress_bar.set(progress))
+            self.progress_bar.set(progress)
             if lang == "en":
-                self.master.after(0, lambda: self.progress_bar_label.configure(text="Processing completed"))
+                self.progress_bar_label.configure(text="Processing completed")
             elif lang == "zh": 
-                self.master.after(0, lambda: self.progress_bar_label.configure(text="處理完成"))
+                self.progress_bar_label.configure(text="處理完成")
 
     def download_video(self):
         """開始下載影片，使用 threading 執行下載任務"""
@@ -578,15 +695,19 @@ class Page1(ctk.CTkFrame):
         file_format = self.format_var.get()
         download_subtitles = self.download_sub_var.get()
         subtitle_lang = self.subtitle_combobox.get()
+        handle = self.video_handle
 
         def download_task():
             # 呼叫 yt_dlp 的 Python API 進行下載
-            output_file = download_video_audio(
-                self.video_url, resolution, self.download_path,
-                downloader, file_format, download_subtitles,
-                subtitle_lang, self.update_progress
-            )
-            logger.info(f"Download Completed: {output_file}")
+            try:
+                output_file = download_video_audio(
+                    self.video_url, resolution, self.download_path,
+                    downloader, file_format, download_subtitles,
+                    subtitle_lang, self.update_progress, handle
+                )
+                logger.info(f"Download Completed: {output_file}")
+            except Exception as e:
+                log_and_show_error(f"Download failed: {e}", self.master)
 
             # 回到主執行緒後重新啟用下載按鈕
             self.master.after(0, lambda: self.download_button.configure(state="normal"))
@@ -617,6 +738,7 @@ class Page1(ctk.CTkFrame):
         ad_image_path = self.master.config.get("ad_image", "")
         if ad_image_path and os.path.exists(ad_image_path):
             try:
+                from PIL import Image, ImageOps  # 延遲載入，縮短程式啟動時間
                 img = Image.open(ad_image_path)
                 # 使用 ImageOps.contain 使圖片在範圍內等比例縮放
                 img = ImageOps.contain(img, (640, 480))
@@ -666,6 +788,10 @@ class Page2(ctk.CTkFrame):
         
         # 播放清單資料，內部儲存，每筆為 dict
         self.playlist_items = []
+        # 播放清單仍在讀取中時為 True，下載工作會持續等待新加入的項目
+        self.listing_active = False
+        # 播放清單下載進行中時為 True
+        self.downloading = False
 
         # 設定 Grid 權重
         self.grid_columnconfigure(0, weight=7)
@@ -720,21 +846,16 @@ class Page2(ctk.CTkFrame):
         self.frame_left_first.grid_rowconfigure(1, weight=1)
         self.frame_left_first.grid_columnconfigure((0,1,2,3,4,5), weight=1)
 
-        self.table_scroll = ctk.CTkScrollableFrame(self.frame_left_first)
-        self.table_scroll.grid(row=0, column=0, columnspan=6, sticky="nsew")
-
-        initial_data = [["Video Title", "Resolution", "Format", "URL"]]
-        self.table = CTkTable(
-            master=self.table_scroll,
-            row=len(initial_data),
-            column=len(initial_data[0]),
-            values=initial_data,
-            # header_color="gray25",
+        # 只繪製可見列的表格，資料直接取自 self.playlist_items
+        self.table_model = ListTableModel(self.playlist_items, ("title", "resolution", "format", "url", "status"))
+        self.table = VirtualTable(
+            self.frame_left_first,
+            model=self.table_model,
+            column_widths=PLAYLIST_COLUMN_WIDTHS,
             hover_color="skyblue",
-            corner_radius=0,
             command=self.on_cell_click
         )
-        self.table.pack(padx=10, pady=10, fill="both", expand=True)
+        self.table.grid(row=0, column=0, columnspan=6, sticky="nsew", padx=10, pady=10)
 
 
         self.select_all_btn = ctk.CTkButton(self.frame_left_first, text="全選", command=self.select_all_rows)
@@ -812,18 +933,10 @@ class Page2(ctk.CTkFrame):
         self.update_text() # 初始化文字
         self.update_resolution_options() # 初始化解析度選項
         self.update_ad_area() # 初始化廣告區
+        self.master.progress_pump.subscribe("page2", self.render_progress)
+        # 各工作的狀態欄由下載執行緒寫入項目後通知，每個 frame 最多重繪一次可見列
+        self.master.progress_pump.subscribe("page2_rows", lambda value: self.table.refresh())
         
-    def set_fixed_column_widths(self, widths):
-        """
-        設定表格每一欄的寬度。
-        widths: 一個列表，每個元素代表對應欄的固定寬度（像素）。
-        例如: [300, 100, 80, 400]
-        """
-        for (row, col), cell in self.table.frame.items():
-            if col in widths:
-                # 設定固定寬度，同時設定 wraplength 避免文字溢出
-                cell.configure(width=widths[col])
-
     def update_table_header(self):
         lang = self.master.current_language
         # 根據語系設定表頭
@@ -831,15 +944,12 @@ class Page2(ctk.CTkFrame):
             LANGUAGES[lang]["video_title"],
             LANGUAGES[lang]["resolution"],
             LANGUAGES[lang]["format"],
-            LANGUAGES[lang]["url"]
+            LANGUAGES[lang]["url"],
+            LANGUAGES[lang]["status"]
         ]
         # 根據主題決定表頭背景色，這裡以 Light 主題用淺灰、Dark 主題用深灰為例
         header_color = "gray90" if self.master.config.get("theme", "Dark") == "Light" else "gray25"
-        # 更新表頭每個 cell 的文字與背景色
-        for col in range(len(header)):
-            if (0, col) in self.table.frame:
-                self.table.frame[(0, col)].configure(text=header[col], fg_color=header_color)
-        self.set_fixed_column_widths([400, 200, 100, 100])
+        self.table.set_headers(header, fg_color=header_color)
 
     def update_total_label(self):
         lang = self.master.current_language
@@ -876,85 +986,95 @@ class Page2(ctk.CTkFrame):
             self.submit_btn.configure(state="normal")
             return
 
-        def task():
-            items = parse_playlist(url, self.resolution_combobox.get(), self.downloader_combobox.get(), self.format_var.get())
-            if not items:
-                log_and_show_error("Failed to parse playlist or no videos found!", self.master)
-                # 回到主執行緒重新啟用提交按鈕
-                self.master.after(0, lambda: self.submit_btn.configure(state="normal"))
-                return
-            # 將解析到的資料加入內部清單
-            for item in items:
-                self.playlist_items.append(item)
+        resolution = self.resolution_combobox.get()
+        downloader = self.downloader_combobox.get()
+        file_format = self.format_var.get()
+        self.listing_active = True
+
+        def add_batch(batch):
             # 在主執行緒中更新 UI（因為 Tkinter 介面更新必須在主執行緒中進行）
-            def update_ui():
-                for item in items:
-                    self.table.add_row([item["title"], item["resolution"], item["format"], item["url"]])
-                self.update_total_label()
-                self.update_table_header()
-                self.submit_btn.configure(state="normal")
-            self.master.after(0, update_ui)
+            # 先寫入工作佇列，程式中斷後不必重新貼上、解析播放清單
+            job_queue.enqueue_many(batch, downloader)
+            self.playlist_items.extend(batch)
+            self.table.refresh()
+            self.update_total_label()
+
+        def finish(count):
+            self.listing_active = False
+            self.submit_btn.configure(state="normal")
+            if count == 0:
+                log_and_show_error("Failed to parse playlist or no videos found!", self.master)
 
-        threading.Thread(target=task).start()
+        def task():
+            # 邊讀取播放清單邊分批加入表格：累積 BATCH_SIZE 筆或經過 BATCH_INTERVAL 秒就送一次到主執行緒
+            count = 0
+            batch = []
+            last_flush = time.perf_counter()
+            try:
+                for item in iter_playlist(url, resolution, downloader, file_format):
+                    batch.append(item)
+                    count += 1
+                    if len(batch) >= PLAYLIST_BATCH_SIZE or time.perf_counter() - last_flush >= PLAYLIST_BATCH_INTERVAL:
+                        self.master.after(0, add_batch, batch)
+                        batch = []
+                        last_flush = time.perf_counter()
+            except Exception as e:
+                log_and_show_error(f"Failed to parse playlist: {e}", self.master)
+            if batch:
+                self.master.after(0, add_batch, batch)
+            # 排在最後一批之後執行，確保下載工作看到 listing_active 為 False 時所有項目都已加入
+            self.master.after(0, finish, count)
 
+        threading.Thread(target=task).start()
 
-    def get_selected_rows(self):
-        selected_rows = []
-        for i in range(self.table.rows):
-            # 依照你的設計，這邊只要檢查每行的第 1 欄是否 == hover_color 即可
-            if self.table.frame[i, 1].cget("fg_color") == self.table.hover_color:
-                selected_rows.append(i)
-        return selected_rows
 
     def select_all_rows(self):
         """
-        遍歷表格中除第一列（表頭）以外的所有列，呼叫 select_row() 使其選取
+        選取所有列；如果所有列都已選取，則取消選取所有列
         """
-        selected_rows = self.get_selected_rows()
-        if len(selected_rows) == self.table.rows - 1:
-            # 如果所有列都已選取，則取消選取所有列
-            for row in range(1, self.table.rows):
-                self.table.deselect_row(row)
+        if self.table_model.all_selected():
+            self.table_model.clear_selection()
         else:
-            # 假設 self.table.rows 回傳表格總列數，且第0列為表頭
-            for row in range(1, self.table.rows):
-                self.table.select_row(row)
+            self.table_model.select_all()
+        self.table.refresh()
 
     def delete_selected_rows(self):
-        """刪除表格中選取的列，並從內部清單中移除"""
-        selected = self.get_selected_rows()  # 假設此方法回傳選取列索引列表
-        for index in sorted(selected, reverse=True):
-            self.table.delete_row(index)
-            del self.playlist_items[index-1]
+        """一次刪除表格中選取的列，並從內部清單中移除"""
+        if self.downloading:
+            # 下載工作依索引取用 playlist_items，下載期間不允許刪除
+            log_and_show_error("Cannot delete items while the playlist is downloading", self.master)
+            return
+        start = time.perf_counter()
+        removed = self.table_model.delete_selected()
+        job_queue.remove([item.get("job_id") for item in removed])
+        self.table.refresh()
+        self.update_total_label()
+        logger.info(f"Deleted {len(removed)} playlist items in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def restore_jobs(self, jobs):
+        """
+        還原上次執行未完成的工作到表格；若上次已開始下載，則自動繼續下載。
+        已下載完成、尚未合併的項目帶有 artifacts，下載時直接交給合併階段。
+        """
+        self.playlist_items.extend(jobs)
+        self.table.refresh()
         self.update_total_label()
+        if any(job["state"] != QUEUED or job["attempts"] for job in jobs):
+            self.download_playlist()
 
     def on_cell_click(self, cell_data):
         """
         當使用者點擊儲存格時呼叫。
         cell_data 格式：
         {
-            "row": <列號>,
+            "row": <資料列索引，對應 playlist_items>,
             "column": <欄號>,
-            "value": <該儲存格文字內容>,
-            "args": <其他設定參數>
+            "value": <該儲存格文字內容>
         }
         """
-        row_index = cell_data["row"]
-        if row_index == 0:
-            # 如果點擊的是表頭，則不做任何事
-            return
-        # 檢查該 row 是否已經被選取：只要比對第二欄的 fg_color 是不是 hover_color
-        is_selected = (self.table.frame[row_index, 1].cget("fg_color") == self.table.hover_color)
-
-        if is_selected:
-            # 如果已選取，則切換成「取消」
-            self.table.deselect_row(row_index)
-        else:
-            # 如果還沒被選取，就「選取」
-            self.table.select_row(row_index)
-
-        # 顯示目前已被選取的所有行
-        selected_rows = self.get_selected_rows()
+        # 切換該列的選取狀態（表頭不在資料列中，點擊表頭不會觸發）
+        self.table_model.toggle(cell_data["row"])
+        self.table.refresh()
 
     def change_download_path(self):
         """變更下載位置"""
@@ -973,68 +1093,185 @@ class Page2(ctk.CTkFrame):
                 self.download_path_textbox.insert("0.0", f"下載位置: {self.download_path}")
             self.download_path_textbox.configure(state="disabled")
 
-    def update_progress(self, progress):
+    def update_progress(self, progress, stats=None):
+        """可由任何執行緒呼叫，只將最新進度（與管線狀態）寫入 progress_bus"""
+        self.master.progress_bus.publish("page2", (progress, stats))
+
+    def render_progress(self, value):
+        """由 progress_pump 在主執行緒呼叫，更新進度條與文字"""
+        progress, stats = value
         lang = self.master.current_language
         if progress != -1:
             percent = int(progress * 100)
-            # 使用 after 確保 GUI 更新在主執行緒中執行
-            self.master.after(0, lambda: self.progress_bar.set(progress))
+            detail = format_pipeline_stats(stats)
+            detail = f"  {detail}" if detail else ""
+            self.progress_bar.set(progress)
             if lang == "en":
-                self.master.after(0, lambda: self.progress_bar_label.configure(text=f"Processing: {percent}%"))
+                self.progress_bar_label.configure(text=f"Processing: {percent}%{detail}")
             elif lang == "zh":
-                self.master.after(0, lambda: self.progress_bar_label.configure(text=f"處理中: {percent}%"))
+                self.progress_bar_label.configure(text=f"處理中: {percent}%{detail}")
         else:
-            self.master.after(100, lambda: self.progress_bar.set(progress))
+            self.progress_bar.set(progress)
             if lang == "en":
-                self.master.after(0, lambda: self.progress_bar_label.configure(text="Processing completed"))
+                self.progress_bar_label.configure(text="Processing completed")
             elif lang == "zh": 
-                self.master.after(0, lambda: self.progress_bar_label.configure(text="處理完成"))
+                self.progress_bar_label.configure(text="處理完成")
     
     def download_playlist(self):
         """
-        使用 ThreadPoolExecutor 控制同時線程數（例如 5 個）來多線程下載播放清單中所有影片，
-        並根據已完成影片數更新進度條。整個流程放入獨立線程中以免阻塞主線程。
+        以兩階段管線下載播放清單中所有影片：網路階段下載串流，CPU 階段執行 ffmpeg 合併/轉檔，
+        並根據已完成影片數與各階段佇列狀態更新進度條。整個流程放入獨立線程中以免阻塞主線程。
         """
         self.download_button.configure(state="disabled")
-        total = len(self.playlist_items)
-        if total == 0:
+        if not self.playlist_items and not self.listing_active:
             self.download_button.configure(state="normal")
             return
+        self.downloading = True
+
+        downloader = self.downloader_combobox.get()
+
+        config = self.master.config
+        completed = 0
+        completed_lock = threading.Lock()  # on_result 由多個 CPU 階段執行緒呼叫
+
+        def mark_completed():
+            nonlocal completed
+            with completed_lock:
+                completed += 1
+                return completed
+
+        # 每個工作各自的進度模型（速度、ETA、各階段耗時），網路階段建立、CPU 階段完成後移除
+        job_progress = {}
+
+        def track_item(item):
+            def on_progress(fraction, stats):
+                item["status"] = format_job_status(stats)
+                self.master.progress_bus.publish("page2_rows", None)
+            return on_progress
+
+        def fetch_item(entry):
+            idx, item = entry
+            item_downloader = item.get("downloader", downloader)
+            progress = job_progress[idx] = JobProgress(item.get("title", "Unknown"), track_item(item))
+            if download_archive.mode == "verify":
+                existing = archived_playlist_item(item)
+                if existing:
+                    logger.info(f"Video {idx} already downloaded and verified, skipping: {existing}")
+                    return {"action": "archived", "output": existing, "inputs": [], "resumed": True}
+            job_queue.mark(item.get("job_id"), DOWNLOADING)
+            # 上次執行已下載完成、尚未合併的項目：暫存檔仍在時直接交給合併階段
+            artifacts = item.pop("artifacts", None)
+            if artifacts and all(os.path.exists(path) for path in artifacts["inputs"]):
+                logger.info(f"Video {idx} resumes from the merge stage: {artifacts['work_dir']}")
+                artifacts["resumed"] = True
+                return artifacts
+            try:
+                # 播放清單以平面模式列出，輪到此項目下載時才解析完整資訊
+                handle = enrich_playlist_item(item, item_downloader)
+                job_queue.update_title(item.get("job_id"), item["title"])
+                progress.name = item["title"]
+                return fetch_playlist_item(
+                    item["url"],
+                    item["resolution"],
+                    self.master.download_path,
+                    item_downloader,
+                    item["format"],
+                    handle,
+                    job_id=item.get("job_id"),
+                    progress=progress
+                )
+            except Exception as e:
+                # 只有網路階段的失敗計入同時下載數的調整，合併/轉檔失敗與頻寬無關
+                controller.record_error(e)
+                raise
+
+        def finish_item(entry, job):
+            progress = job_progress.pop(entry[0], None)
+            output_file = finish_playlist_item(job, progress)
+            if progress is not None:
+                entry[1]["status"] = f"done · {progress.snapshot()['elapsed']:.1f}s"
+                self.master.progress_bus.publish("page2_rows", None)
+            return output_file
+
+        # 同時下載數依吞吐量與 429 限流自動調整，起始值沿用上次執行的結果
+        controller = AdaptiveConcurrency(
+            min_limit=config.get("download_concurrency_min", 1),
+            max_limit=config.get("download_concurrency_max", 12),
+            initial=config.get("download_concurrency_hint", 4)
+        )
 
-        def download_item(item, idx):
-            output_file = download_video_audio_playlist(
-                item["url"],
-                item["resolution"],
-                self.master.download_path,
-                self.downloader_combobox.get(),
-                item["format"]
-            )
-            return idx, output_file
+        def current_stats():
+            return {**pipeline.stats(), **controller.snapshot()}
+
+        def on_fetched(entry, job):
+            job_queue.mark(entry[1].get("job_id"), MERGING, artifacts=job)
+            if not job.get("resumed"):
+                controller.record_success(sum(os.path.getsize(path) for path in job["inputs"] if os.path.exists(path)))
+
+        def on_result(entry, output_file):
+            job_queue.mark(entry[1].get("job_id"), DONE, output=output_file)
+            progress = mark_completed() / max(len(self.playlist_items), 1)
+            # 進度寫入 progress_bus，由主線程的 progress_pump 統一更新
+            self.update_progress(progress, current_stats())
+            logger.info(f"Video {entry[0]} downloaded: {output_file}")
+
+        def on_error(entry, error):
+            job_queue.mark(entry[1].get("job_id"), FAILED, error=str(error))
+            job_progress.pop(entry[0], None)
+            entry[1]["status"] = "failed"
+            self.master.progress_bus.publish("page2_rows", None)
+            log_and_show_error(f"Download failed: {error}", self.master)
+
+        pipeline = TwoStagePipeline(
+            fetch_item, finish_item,
+            network_workers=controller.max_limit,
+            network_limit=controller.limit,
+            cpu_workers=config.get("pipeline_cpu_workers", 2),
+            queue_size=config.get("pipeline_queue_size", 4),
+            on_result=on_result, on_error=on_error, on_fetched=on_fetched
+        )
+
+        def adjust_concurrency():
+            limit = controller.tick(pipeline.stats()["network_busy"])
+            if limit is not None and limit != pipeline.network_limit:
+                pipeline.set_network_limit(limit)
+
+        def finish_download():
+            self.downloading = False
+            self.download_button.configure(state="normal")
+            # 記住最後的同時下載數，作為下次的起始值
+            config["download_concurrency_hint"] = controller.limit
+            save_config(config)
 
         def thread_func():
-            completed = 0
-            max_threads = 4  # 同時最多執行 4 個下載任務
-            self.master.after(0, lambda: self.update_progress(0))
-            with ThreadPoolExecutor(max_workers=max_threads) as executor:
-                futures = [executor.submit(download_item, item, idx)
-                        for idx, item in enumerate(self.playlist_items)]
-                for future in as_completed(futures):
-                    try:
-                        idx, output_file = future.result()
-                    except Exception as e:
-                        log_and_show_error(f"Download failed: {e}", self.master)
-                        continue
-                    completed += 1
-                    progress = completed / total
-                    # 更新進度條必須在主線程中執行
-                    self.master.after(0, lambda: self.update_progress(progress))
-                    logger.info(f"Video {idx} downloaded: {output_file}")
+            next_index = 0
+            self.update_progress(0, current_stats())
+            # 播放清單仍在讀取時，已加入的項目先開始下載，之後加入的項目陸續送出；
+            # 網路階段忙碌時 submit 會等待，期間持續調整同時下載數並回報各階段佇列狀態
+            while next_index < len(self.playlist_items) or self.listing_active or not pipeline.idle():
+                if next_index < len(self.playlist_items):
+                    item = self.playlist_items[next_index]
+                    # 下載紀錄中已完成且檔案完好的項目直接跳過；
+                    # verify 模式需讀取整個檔案計算雜湊，改由網路階段的執行緒檢查，不拖住整份清單的派送
+                    existing = archived_playlist_item(item) if download_archive.mode != "verify" else None
+                    if existing:
+                        logger.info(f"Video {next_index} already downloaded, skipping: {existing}")
+                        job_queue.mark(item.get("job_id"), DONE, output=existing)
+                        mark_completed()
+                        next_index += 1
+                    elif pipeline.submit((next_index, item), timeout=0.2):
+                        next_index += 1
+                else:
+                    time.sleep(0.2)
+                adjust_concurrency()
+                self.update_progress(completed / max(len(self.playlist_items), 1), current_stats())
+            pipeline.close()
             # 所有任務完成後，回到主線程中重新啟用按鈕與設定進度條
-            self.master.after(0, lambda: self.download_button.configure(state="normal"))
-            self.master.after(0, lambda: self.update_progress(-1))
+            self.master.after(0, finish_download)
+            self.update_progress(-1)
             logger.info("All videos downloaded")
 
-        # 將整個 ThreadPoolExecutor 流程放到獨立線程中執行，避免阻塞主線程
+        # 將整個管線流程放到獨立線程中執行，避免阻塞主線程
         threading.Thread(target=thread_func).start()
 
 
@@ -1043,6 +1280,7 @@ class Page2(ctk.CTkFrame):
         ad_image_path = self.master.config.get("ad_image", "")
         if ad_image_path and os.path.exists(ad_image_path):
             try:
+                from PIL import Image, ImageOps  # 延遲載入，縮短程式啟動時間
                 img = Image.open(ad_image_path)
                 # 使用 ImageOps.contain 使圖片在範圍內等比例縮放
                 img = ImageOps.contain(img, (640, 480))
@@ -1249,6 +1487,7 @@ class Page3(ctk.CTkFrame):
 
         self.update_text() # 初始化文字
         self.update_ad_area() # 初始化廣告區
+        self.master.progress_pump.subscribe("page3", self.render_progress)
 
     def browse_file(self):
         file_path = filedialog.askopenfilename(
@@ -1331,18 +1570,22 @@ class Page3(ctk.CTkFrame):
             self.param_combobox.set("128kbps")
 
     def update_progress(self, progress):
+        """可由任何執行緒呼叫，只將最新進度寫入 progress_bus"""
+        self.master.progress_bus.publish("page3", progress)
+
+    def render_progress(self, progress):
+        """由 progress_pump 在主執行緒呼叫，更新進度條與文字"""
         lang= self.master.current_language 
         if progress != -1:
             percent = int(progress * 100)
-            # 使用 after 確保 GUI 更新在主執行緒中執行
-            self.master.after(0, lambda: self.progress_bar.set(progress))
-            self.master.after(0, lambda: self.progress_label.configure(text=f"Converting {percent}%"))
+            self.progress_bar.set(progress)
+            self.progress_label.configure(text=f"Converting {percent}%")
         else:
-            self.master.after(100, lambda: self.progress_bar.set(progress))
+            self.progress_bar.set(progress)
             if lang == "en":
-                self.master.after(0, lambda: self.progress_label.configure(text="Converting completed"))
+                self.progress_label.configure(text="Converting completed")
             elif lang == "zh": 
-                self.master.after(0, lambda: self.progress_label.configure(text="轉換完成"))
+                self.progress_label.configure(text="轉換完成")
 
     def start_conversion(self):
         file_path = self.selected_file.get()
@@ -1366,15 +1609,21 @@ class Page3(ctk.CTkFrame):
                 duration_str = get_media_duration(file_path)
                 conversion_duration = time_to_seconds(duration_str) if duration_str else 0
 
-            if conv_type == "video":
-                video_transcoder = self.video_transcoder_combobox.get()
-                audio_transcoder = self.audio_transcoder_combobox.get()
-                output = convert_video(
-                file_path, param, target_format, start_time, conversion_duration,
-                video_transcoder, audio_transcoder, self.update_progress
-            )
-            else:
-                output = convert_audio(file_path, param, target_format, start_time, conversion_duration, self.update_progress)
+            try:
+                if conv_type == "video":
+                    video_transcoder = self.video_transcoder_combobox.get()
+                    audio_transcoder = self.audio_transcoder_combobox.get()
+                    output = convert_video(
+                    file_path, param, target_format, start_time, conversion_duration,
+                    video_transcoder, audio_transcoder, self.update_progress
+                )
+                else:
+                    output = convert_audio(file_path, param, target_format, start_time, conversion_duration, self.update_progress)
+            except Exception as e:
+                self.master.after(0, lambda: self.convert_button.configure(state="normal"))
+                self.master.after(0, lambda: self.progress_label.configure(text="Conversion failed"))
+                log_and_show_error(f"Conversion failed: {e}", self.master)
+                return
            
             # 使用 after 確保 GUI 更新在主執行緒中執行 
             self.master.after(0, lambda: self.converted_file_display.configure(state="normal"))
@@ -1393,6 +1642,7 @@ class Page3(ctk.CTkFrame):
         ad_image_path = self.master.config.get("ad_image", "")
         if ad_image_path and os.path.exists(ad_image_path):
             try:
+                from PIL import Image, ImageOps  # 延遲載入，縮短程式啟動時間
                 img = Image.open(ad_image_path)
                 # 使用 ImageOps.contain 使圖片在範圍內等比例縮放
                 img = ImageOps.contain(img, (640, 480))
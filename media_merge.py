@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import time
+import subprocess
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+FFMPEG_PATH = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffmpeg.exe')
+FFPROBE_PATH = os.path.join(os.path.dirname(__file__), 'ffmpeg', 'bin', 'ffprobe.exe')
+
+# 各容器可直接封裝（不需轉碼）的編碼；None 代表不限制
+CONTAINER_CODECS = {
+    "mp4": {
+        "video": {"h264", "hevc", "av1", "vp9", "mpeg4"},
+        "audio": {"aac", "mp3", "alac", "ac3", "eac3"},
+    },
+    "mov": {
+        "video": {"h264", "hevc", "mpeg4", "prores"},
+        "audio": {"aac", "mp3", "alac", "ac3"},
+    },
+    "webm": {
+        "video": {"vp8", "vp9", "av1"},
+        "audio": {"opus", "vorbis"},
+    },
+    "mkv": {"video": None, "audio": None},
+}
+
+# 音訊必須轉碼時各容器使用的編碼器
+FALLBACK_AUDIO_ENCODER = {"mp4": "aac", "mov": "aac", "webm": "libopus", "mkv": "aac"}
+
+_DURATION_PATTERN = re.compile(r'Duration: (\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)')
+_TIME_PATTERN = re.compile(r'time=(\d{2}):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+def probe_codecs(path):
+    """以 ffprobe 取得檔案第一條影片與音訊串流的編碼名稱，例如 {"video": "vp9", "audio": "opus"}"""
+    command = [
+        FFPROBE_PATH, "-v", "error", "-show_entries", "stream=codec_type,codec_name",
+        "-of", "json", path
+    ]
+    codecs = {"video": None, "audio": None}
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                text=True, encoding='utf-8', errors='replace',
+                                creationflags=subprocess.CREATE_NO_WINDOW)
+        for stream in json.loads(result.stdout or "{}").get("streams", []):
+            codec_type = stream.get("codec_type")
+            if codec_type in codecs and codecs[codec_type] is None:
+                codecs[codec_type] = stream.get("codec_name")
+    except (OSError, ValueError) as e:
+        logger.warning(f"ffprobe failed for {path}: {e}")
+    return codecs
+
+def can_copy(codec, container, codec_type):
+    """判斷該編碼能否不經轉碼直接放入目標容器"""
+    allowed = CONTAINER_CODECS.get(container, {}).get(codec_type, set())
+    if allowed is None:
+        return True
+    return codec is not None and codec in allowed
+
+def build_merge_command(video_path, audio_path, output_path, transcode=False):
+    """
+    依輸入編碼決定合併參數：能直接封裝時使用 -c copy，否則只轉碼不相容的串流。
+    編碼未知（ffprobe 失敗）時視為無法封裝；transcode 為 True 時影音一律轉碼。
+    回傳 (ffmpeg 指令, 是否為純封裝)
+    """
+    container = os.path.splitext(output_path)[1].lstrip(".").lower()
+    video_codec = audio_codec = None
+    if not transcode:
+        video_codec = probe_codecs(video_path)["video"]
+        audio_codec = probe_codecs(audio_path)["audio"]
+    copy_video = not transcode and can_copy(video_codec, container, "video")
+    copy_audio = not transcode and can_copy(audio_codec, container, "audio")
+
+    command = [FFMPEG_PATH, '-y', '-i', video_path, '-i', audio_path, '-map', '0:v:0', '-map', '1:a:0']
+    command += ['-c:v', 'copy' if copy_video else 'libx264']
+    if copy_audio:
+        command += ['-c:a', 'copy']
+    else:
+        command += ['-c:a', FALLBACK_AUDIO_ENCODER.get(container, 'aac')]
+    command.append(output_path)
+    logger.info(f"Merge codecs: video={video_codec} audio={audio_codec} container={container} "
+                f"copy_video={copy_video} copy_audio={copy_audio}")
+    return command, copy_video and copy_audio
+
+def _parse_time(match):
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def run_ffmpeg(command, progress_callback=None):
+    """
+    執行 ffmpeg 並解析 stderr 的 Duration 與 time=，以 0~1 的比例回報處理進度。
+    回傳 ffmpeg 的結束代碼。
+    """
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, encoding='utf-8', errors='replace',
+                               creationflags=subprocess.CREATE_NO_WINDOW)
+    total_duration = None
+    for line in process.stderr:
+        # 先解析總長度
+        if total_duration is None:
+            duration_match = _DURATION_PATTERN.search(line)
+            if duration_match:
+                total_duration = _parse_time(duration_match)
+        # 若已取得總長度，解析當前處理進度
+        time_match = _TIME_PATTERN.search(line)
+        if time_match and total_duration and progress_callback:
+            progress_callback(min(_parse_time(time_match) / total_duration, 1.0))
+    return process.wait()
+
+def merge_video_audio(video_path, audio_path, output_path, progress_callback=None, progress_start=0.6, progress_end=1.0):
+    """
+    使用 FFmpeg 合併影片和音訊，能直接封裝時不轉碼；封裝失敗時改以 libx264/aac 轉碼重試。
+    progress_callback: 合併進度會對應到 progress_start ~ progress_end 之間回報
+    """
+    command, stream_copy = build_merge_command(video_path, audio_path, output_path)
+    start = time.perf_counter()
+    on_progress = None
+    if progress_callback:
+        on_progress = lambda fraction: progress_callback(progress_start + fraction * (progress_end - progress_start))
+    returncode = run_ffmpeg(command, on_progress)
+    if returncode != 0 and 'copy' in command:
+        logger.warning(f"Stream copy merge of {os.path.basename(output_path)} failed with exit code {returncode}, "
+                       f"retrying with transcode")
+        command, stream_copy = build_merge_command(video_path, audio_path, output_path, transcode=True)
+        returncode = run_ffmpeg(command, on_progress)
+
+    elapsed = time.perf_counter() - start
+    path_name = "stream copy" if stream_copy else "transcode"
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg merge ({path_name}) failed with exit code {returncode}")
+    logger.info(f"Merged {os.path.basename(output_path)} via {path_name} in {elapsed:.2f} seconds")
+    return stream_copy
+
+def merge_timing_hook():
+    """
+    產生 yt_dlp 的 postprocessor_hooks，記錄 yt_dlp 內建合併（Merger）所花的時間。
+    yt_dlp 的 Merger 一律以 -c copy 封裝。
+    """
+    started = {}
+
+    def hook(d):
+        if d.get('postprocessor') != 'Merger':
+            return
+        if d['status'] == 'started':
+            started['time'] = time.perf_counter()
+        elif d['status'] == 'finished' and 'time' in started:
+            elapsed = time.perf_counter() - started.pop('time')
+            logger.info(f"yt_dlp merged via stream copy in {elapsed:.2f} seconds")
+    return hook
@@ -0,0 +1,190 @@
+import queue
+import threading
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+_STOP = object()
+
+class TwoStagePipeline:
+    """
+    兩階段的工作管線：網路階段（下載串流）與 CPU 階段（ffmpeg 合併/轉檔、發佈）各有自己的執行緒，
+    以有上限的佇列相連。
+    - 網路執行緒數依頻寬設定，CPU 執行緒數依核心數設定，ffmpeg 忙碌時不會佔住下載名額
+    - CPU 佇列滿時網路執行緒在 put() 等待（backpressure），暫存區不會無限制地累積已下載未處理的檔案
+    - 因此第 N 項合併時，第 N+1 項已在下載
+
+    fetch(item) 在網路階段執行並回傳交給 CPU 階段的工作；finish(item, job) 在 CPU 階段執行並回傳結果。
+    網路階段完成時呼叫 on_fetched(item, job)，每項完成時呼叫 on_result(item, result)，
+    任一階段失敗時呼叫 on_error(item, exception)。
+    network_workers 為網路執行緒數上限，實際同時下載數由 network_limit 決定，可於執行中以 set_network_limit 調整。
+    """
+    def __init__(self, fetch, finish, network_workers=4, cpu_workers=2, queue_size=4,
+                 on_result=None, on_error=None, on_fetched=None, network_limit=None):
+        self.fetch = fetch
+        self.finish = finish
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_fetched = on_fetched
+        self.network_workers = max(1, network_workers)
+        self.network_limit = min(max(1, network_limit or self.network_workers), self.network_workers)
+        self.cpu_workers = max(1, cpu_workers)
+        # 輸入佇列容量與網路執行緒數相同：submit() 在網路階段忙不過來時等待
+        self.input_queue = queue.Queue(maxsize=self.network_workers)
+        self.cpu_queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._slots_taken = 0  # 取得下載名額的網路執行緒數（含等待新工作者）
+        self._network_busy = 0  # 正在下載的項目數
+        self._cpu_busy = 0
+        self._submitted = 0
+        self._finished = 0
+        self._network_threads = [
+            threading.Thread(target=self._network_loop, name=f"pipeline-net-{i}", daemon=True)
+            for i in range(self.network_workers)
+        ]
+        self._cpu_threads = [
+            threading.Thread(target=self._cpu_loop, name=f"pipeline-cpu-{i}", daemon=True)
+            for i in range(self.cpu_workers)
+        ]
+        for thread in self._network_threads + self._cpu_threads:
+            thread.start()
+
+    def submit(self, item, timeout=None):
+        """送出一項工作；輸入佇列已滿時等待。逾時回傳 False"""
+        try:
+            self.input_queue.put(item, timeout=timeout)
+        except queue.Full:
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def set_network_limit(self, limit):
+        """調整同時下載數；降低時進行中的下載會做完，之後多出的執行緒暫停取新工作"""
+        with self._slots:
+            self.network_limit = min(max(1, limit), self.network_workers)
+            self._slots.notify_all()
+
+    def idle(self):
+        """已送出的工作是否都已完成"""
+        with self._lock:
+            return self._finished >= self._submitted
+
+    def close(self):
+        """不再送出新工作，等待所有工作完成後結束執行緒"""
+        with self._slots:
+            while self._finished < self._submitted:
+                self._slots.wait()
+        # 佇列已清空，讓所有網路執行緒都能取到結束訊號
+        self.set_network_limit(self.network_workers)
+        for _ in self._network_threads:
+            self.input_queue.put(_STOP)
+        for thread in self._network_threads:
+            thread.join()
+        for _ in self._cpu_threads:
+            self.cpu_queue.put(_STOP)
+        for thread in self._cpu_threads:
+            thread.join()
+
+    def stats(self):
+        """各階段的忙碌執行緒數與佇列填滿程度，供進度列顯示"""
+        with self._lock:
+            return {
+                "network_busy": self._network_busy,
+                "network_limit": self.network_limit,
+                "network_workers": self.network_workers,
+                "input_queued": self.input_queue.qsize(),
+                "input_capacity": self.input_queue.maxsize,
+                "cpu_busy": self._cpu_busy,
+                "cpu_workers": self.cpu_workers,
+                "cpu_queued": self.cpu_queue.qsize(),
+                "cpu_capacity": self.cpu_queue.maxsize,
+                "submitted": self._submitted,
+                "finished": self._finished,
+            }
+
+    def _network_loop(self):
+        while True:
+            # 同時下載數已達 network_limit 時等待其他執行緒完成
+            with self._slots:
+                while self._slots_taken >= self.network_limit:
+                    self._slots.wait()
+                self._slots_taken += 1
+            item = self.input_queue.get()
+            if item is _STOP:
+                self._release_slot(busy=False)
+                return
+            with self._lock:
+                self._network_busy += 1
+            try:
+                job = self.fetch(item)
+            except Exception as e:
+                self._release_slot()
+                self._report_error(item, e)
+                continue
+            self._release_slot()
+            try:
+                if self.on_fetched:
+                    self.on_fetched(item, job)
+                # CPU 佇列已滿時在此等待，不再取新的下載工作
+                self.cpu_queue.put((item, job))
+            except Exception as e:
+                # 交接失敗時仍須記為完成，否則 close() 會一直等待
+                self._report_error(item, e)
+
+    def _release_slot(self, busy=True):
+        with self._slots:
+            self._slots_taken -= 1
+            if busy:
+                self._network_busy -= 1
+            self._slots.notify()
+
+    def _cpu_loop(self):
+        while True:
+            entry = self.cpu_queue.get()
+            if entry is _STOP:
+                return
+            item, job = entry
+            with self._lock:
+                self._cpu_busy += 1
+            try:
+                result = self.finish(item, job)
+            except Exception as e:
+                self._report_error(item, e)
+                continue
+            finally:
+                with self._lock:
+                    self._cpu_busy -= 1
+            self._mark_finished()
+            if self.on_result:
+                self.on_result(item, result)
+
+    def _mark_finished(self):
+        with self._slots:
+            self._finished += 1
+            self._slots.notify_all()
+
+    def _report_error(self, item, error):
+        self._mark_finished()
+        logger.error(f"Pipeline item failed: {error}")
+        if self.on_error:
+            self.on_error(item, error)
+
+def format_pipeline_stats(stats):
+    """
+    各階段的忙碌執行緒數與等待佇列，例如
+    "fetch 3/4 (queue 2/12) · 12.3 MB/s · ffmpeg 1/2 (queue 2/4)"
+    """
+    if not stats:
+        return ""
+    parts = [f"fetch {stats['network_busy']}/{stats['network_limit']} "
+             f"(queue {stats['input_queued']}/{stats['input_capacity']})"]
+    if stats.get("throughput_mbps"):
+        parts.append(f"{stats['throughput_mbps']:.1f} MB/s")
+    parts.append(f"ffmpeg {stats['cpu_busy']}/{stats['cpu_workers']} "
+                 f"(queue {stats['cpu_queued']}/{stats['cpu_capacity']})")
+    return " · ".join(parts)
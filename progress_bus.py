@@ -0,0 +1,66 @@
+import threading
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+DEFAULT_FPS = 25
+
+class ProgressBus:
+    """
+    執行緒安全的進度匯流排。
+    下載/轉檔執行緒呼叫 publish() 只需寫入字典，每個工作僅保留最新一筆數值，
+    由主執行緒的 ProgressPump 以固定頻率取出並更新 UI。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+
+    def publish(self, job, value):
+        with self._lock:
+            self._latest[job] = value
+
+    def drain(self):
+        """取出並清空目前累積的最新數值"""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        return latest
+
+class ProgressPump:
+    """
+    在 Tk 主執行緒以固定頻率（預設 25 Hz）清空 ProgressBus，
+    並呼叫各工作註冊的 handler；不論有多少執行緒或 chunk 回報，每個 frame 每個工作只更新一次。
+    """
+    def __init__(self, master, bus, fps=DEFAULT_FPS):
+        self.master = master
+        self.bus = bus
+        self.interval = max(1, int(1000 / fps))
+        self._handlers = {}
+        self._running = False
+
+    def subscribe(self, job, handler):
+        self._handlers[job] = handler
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.master.after(self.interval, self._tick)
+
+    def _tick(self):
+        if not self._running:
+            return
+        try:
+            for job, value in self.bus.drain().items():
+                handler = self._handlers.get(job)
+                if handler is None:
+                    continue
+                # 單一 handler 出錯不影響其他工作的更新
+                try:
+                    handler(value)
+                except Exception as e:
+                    logger.error(f"Progress handler for {job} failed: {e}")
+        finally:
+            # 無論如何都排定下一次更新，否則進度會就此停止
+            self.master.after(self.interval, self._tick)
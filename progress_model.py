@@ -0,0 +1,178 @@
+import time
+import threading
+from collections import deque
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+WINDOW_SECONDS = 3.0        # 計算瞬時速度與 ETA 的時間窗
+# 後製階段相對於下載位元組的權重：純封裝幾乎只是複製檔案，轉碼則需要解碼+編碼整段媒體
+COPY_WEIGHT_FACTOR = 0.05
+TRANSCODE_WEIGHT_FACTOR = 0.3
+
+class Stage:
+    def __init__(self, name, total_bytes=0, factor=None):
+        self.name = name
+        self.total_bytes = total_bytes  # 下載階段的實際位元組數
+        self.factor = factor  # 後製階段：權重 = 下載總位元組 * factor，階段內進度依媒體時長計算
+        self.fraction = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+class JobProgress:
+    """
+    依階段加權的進度模型。
+    下載階段的權重為實際位元組數，合併/轉檔階段的權重由下載總位元組數乘上係數估算，
+    其階段內進度則依 ffmpeg 回報的媒體時間計算。
+    另提供瞬時/平均速度（MB/s）、ETA 與各階段耗時，結果透過 progress_callback(fraction, stats) 回報。
+    """
+    def __init__(self, name, progress_callback=None):
+        self.name = name
+        self.progress_callback = progress_callback
+        self.stages = {}
+        self.created_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._samples = deque()  # (時間, 已下載位元組)
+        self._fraction_samples = deque()  # (時間, 整體進度)
+
+    def add_download_stage(self, name, total_bytes=0):
+        with self._lock:
+            self.stages[name] = Stage(name, total_bytes=total_bytes)
+
+    def add_processing_stage(self, name, stream_copy=True):
+        factor = COPY_WEIGHT_FACTOR if stream_copy else TRANSCODE_WEIGHT_FACTOR
+        with self._lock:
+            self.stages[name] = Stage(name, factor=factor)
+
+    def set_stage_bytes(self, name, total_bytes):
+        """下載前無法得知大小時（例如 yt_dlp 逐檔回報），於取得大小後更新"""
+        with self._lock:
+            self.stages[name].total_bytes = total_bytes
+
+    def update(self, name, fraction):
+        """更新某階段的完成比例（0~1）"""
+        now = time.perf_counter()
+        with self._lock:
+            stage = self.stages[name]
+            if stage.started_at is None:
+                stage.started_at = now
+            stage.fraction = min(max(fraction, stage.fraction), 1.0)
+            if stage.fraction >= 1.0 and stage.finished_at is None:
+                stage.finished_at = now
+            self._record(now)
+            overall = self._overall()
+            stats = self._stats(now, overall)
+        if self.progress_callback:
+            self.progress_callback(overall, stats)
+
+    def finish_stage(self, name):
+        self.update(name, 1.0)
+
+    def complete(self):
+        """工作結束：未執行的階段（例如單一檔案不需合併）直接視為完成，耗時為 0"""
+        now = time.perf_counter()
+        with self._lock:
+            for stage in self.stages.values():
+                if stage.started_at is None:
+                    stage.started_at = now
+                stage.fraction = 1.0
+                if stage.finished_at is None:
+                    stage.finished_at = now
+
+    def snapshot(self):
+        with self._lock:
+            overall = self._overall()
+            return self._stats(time.perf_counter(), overall)
+
+    def log_summary(self):
+        """記錄各階段耗時與平均速度，方便分析時間花在哪裡"""
+        stats = self.snapshot()
+        stage_text = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stats["stage_seconds"].items())
+        logger.info(f"{self.name}: total {stats['elapsed']:.2f}s ({stage_text}); "
+                    f"average {stats['avg_mbps']:.2f} MB/s")
+
+    # ------------------------------
+    # 以下皆在持有 self._lock 時呼叫
+    # ------------------------------
+    def _downloaded_bytes(self):
+        return sum(stage.total_bytes * stage.fraction for stage in self.stages.values() if stage.total_bytes)
+
+    def _weights(self):
+        download_bytes = sum(stage.total_bytes for stage in self.stages.values() if stage.factor is None)
+        return {
+            name: max(download_bytes * stage.factor if stage.factor is not None else stage.total_bytes, 1)
+            for name, stage in self.stages.items()
+        }
+
+    def _overall(self):
+        weights = self._weights()
+        total_weight = sum(weights.values())
+        if not total_weight:
+            return 0.0
+        return sum(weights[name] * stage.fraction for name, stage in self.stages.items()) / total_weight
+
+    def _record(self, now):
+        self._samples.append((now, self._downloaded_bytes()))
+        self._fraction_samples.append((now, self._overall()))
+        for samples in (self._samples, self._fraction_samples):
+            while len(samples) > 2 and now - samples[0][0] > WINDOW_SECONDS:
+                samples.popleft()
+
+    def _stats(self, now, overall):
+        elapsed = now - self.created_at
+        inst_mbps = 0.0
+        if len(self._samples) >= 2:
+            (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+            if t1 > t0:
+                inst_mbps = (b1 - b0) / (t1 - t0) / (1024 * 1024)
+        download_seconds = sum(stage.elapsed for stage in self.stages.values() if stage.total_bytes)
+        avg_mbps = self._downloaded_bytes() / download_seconds / (1024 * 1024) if download_seconds else 0.0
+
+        eta = None
+        if len(self._fraction_samples) >= 2:
+            (t0, f0), (t1, f1) = self._fraction_samples[0], self._fraction_samples[-1]
+            if f1 > f0 and t1 > t0:
+                eta = (1.0 - overall) / ((f1 - f0) / (t1 - t0))
+        current = next((stage.name for stage in self.stages.values()
+                        if stage.started_at is not None and stage.finished_at is None), None)
+        return {
+            "fraction": overall,
+            "stage": current,
+            "inst_mbps": inst_mbps,
+            "avg_mbps": avg_mbps,
+            "eta": eta,
+            "elapsed": elapsed,
+            "stage_seconds": {name: stage.elapsed for name, stage in self.stages.items()},
+        }
+
+def format_job_status(stats):
+    """播放清單表格中單一工作的狀態文字，例如 "42% download · 12.3 MB/s · ETA 00:32" """
+    if not stats:
+        return ""
+    status = f"{int(stats['fraction'] * 100)}%"
+    if stats.get("stage"):
+        status += f" {stats['stage']}"
+    detail = format_stats(stats)
+    return f"{status} · {detail}" if detail else status
+
+def format_stats(stats):
+    """將統計資料轉為進度列顯示的文字，例如 "12.3 MB/s · ETA 00:32" """
+    if not stats:
+        return ""
+    parts = []
+    if stats.get("inst_mbps"):
+        parts.append(f"{stats['inst_mbps']:.1f} MB/s")
+    eta = stats.get("eta")
+    if eta is not None:
+        minutes, seconds = divmod(int(eta), 60)
+        parts.append(f"ETA {minutes:02}:{seconds:02}")
+    return " · ".join(parts)
@@ -0,0 +1,158 @@
+import os
+import time
+import uuid
+import errno
+import shutil
+from logging_config import setup_logger
+from filename_allocator import filename_allocator
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+DEFAULT_SCRATCH_DIR = "scratch"
+# 含有這些副檔名的工作目錄代表下載尚未完成，可於下次執行時續傳，啟動清理時保留
+RESUMABLE_SUFFIXES = (".journal", ".part")
+COPY_CHUNK = 8 * 1024 * 1024
+
+def _kernel_copy(src, dst):
+    """
+    以核心端複製檔案內容（copy_file_range，其次 sendfile），資料不經過使用者空間；
+    平台不支援時退回 shutil.copyfileobj。
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        for name in ("copy_file_range", "sendfile"):
+            copy = getattr(os, name, None)
+            if copy is None:
+                continue
+            try:
+                offset = 0
+                while offset < size:
+                    if name == "copy_file_range":
+                        sent = copy(fsrc.fileno(), fdst.fileno(), min(COPY_CHUNK, size - offset))
+                    else:
+                        sent = copy(fdst.fileno(), fsrc.fileno(), offset, min(COPY_CHUNK, size - offset))
+                    if sent == 0:
+                        break
+                    offset += sent
+                if offset == size:
+                    fdst.flush()
+                    os.fsync(fdst.fileno())
+                    return
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                    raise
+            # 此方法無法使用，重設兩端位置後改用下一種
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK)
+        fdst.flush()
+        os.fsync(fdst.fileno())
+
+def make_job_key(*parts):
+    """
+    由工作內容（網址、解析度、下載器、格式等）產生固定的工作代號。
+    同一時間可能有多個內容相同的工作時，需加入能區分它們的部分（例如工作佇列的代號），
+    否則會共用暫存目錄，先完成者 release() 時會刪掉另一個工作的暫存檔。
+    """
+    return uuid.uuid5(uuid.NAMESPACE_URL, "|".join(str(part) for part in parts)).hex
+
+class ScratchArea:
+    """
+    下載暫存區。每個工作使用 root 下各自的子目錄存放串流、.part 與合併中的檔案，
+    完成後以 publish() 原子地搬到下載目錄，避免同時進行的工作互相覆寫暫存檔，
+    下載目錄中也不會出現寫到一半的檔案。
+    """
+    def __init__(self, root=DEFAULT_SCRATCH_DIR):
+        self.root = root
+
+    def configure(self, root=None):
+        self.root = root or DEFAULT_SCRATCH_DIR
+
+    def job_dir(self, job_key):
+        """
+        取得（必要時建立）工作的暫存子目錄。
+        job_key 由工作內容決定，中斷後重新下載同一項目時會回到同一個目錄並沿用其中的續傳紀錄。
+        """
+        path = os.path.join(self.root, job_key)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def release(self, path):
+        """工作完成後移除其暫存子目錄"""
+        shutil.rmtree(path, ignore_errors=True)
+
+    def publish(self, src, dest_path):
+        """
+        將暫存檔發佈到 dest_path。
+        同一檔案系統時直接 os.replace；跨裝置時先以核心端複製寫入目的目錄中的暫存檔，
+        再以 os.replace 換成正式檔名，因此目的地只會看到完整的檔案。
+        """
+        dest_dir = os.path.dirname(dest_path) or "."
+        if os.stat(src).st_dev == os.stat(dest_dir).st_dev:
+            try:
+                os.replace(src, dest_path)
+                return dest_path
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        start = time.perf_counter()
+        staging = os.path.join(dest_dir, f".{os.path.basename(dest_path)}.{os.getpid()}.tmp")
+        try:
+            _kernel_copy(src, staging)
+            os.replace(staging, dest_path)
+        except BaseException:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+        os.remove(src)
+        logger.info(f"Published {os.path.basename(dest_path)} across devices in "
+                    f"{time.perf_counter() - start:.2f} seconds")
+        return dest_path
+
+    def publish_unique(self, src, directory, filename):
+        """於 directory 配置不重複的檔名（name (1).ext …）並發佈，回傳最終路徑"""
+        dest_path = filename_allocator.allocate(directory, filename)
+        try:
+            return self.publish(src, dest_path)
+        except BaseException:
+            filename_allocator.release(dest_path)
+            raise
+
+    def cleanup_orphans(self, max_age_hours=168, keep=()):
+        """
+        清除先前執行留下的暫存檔。
+        含有續傳紀錄（.journal / .part）且未超過 max_age_hours 的工作目錄會保留，以便下次續傳；
+        keep 中的工作目錄（例如工作佇列中已下載、尚未合併的項目）一律保留。
+        """
+        if not os.path.isdir(self.root):
+            return
+        keep = {os.path.basename(os.path.normpath(path)) for path in keep}
+        now = time.time()
+        removed = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name in keep or self._is_resumable(entry.path, now, max_age_hours):
+                            continue
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.remove(entry.path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Failed to remove scratch entry {entry.path}: {e}")
+        if removed:
+            logger.info(f"Removed {removed} orphaned scratch entries from {self.root}")
+
+    def _is_resumable(self, path, now, max_age_hours):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.endswith(RESUMABLE_SUFFIXES):
+                    return now - entry.stat().st_mtime < max_age_hours * 3600
+        return False
+
+scratch_area = ScratchArea()
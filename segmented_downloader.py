@@ -0,0 +1,218 @@
+import os
+import threading
+from collections import deque
+from logging_config import setup_logger
+from transfer_journal import TransferJournal
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024       # 每個區段的大小
+MIN_STEAL_SIZE = 1024 * 1024               # 剩餘量小於此值的區段不再分割
+READ_SIZE = 64 * 1024
+MAX_RETRIES = 3
+
+class RangeNotSupported(Exception):
+    """伺服器不支援 Range 請求或無法得知檔案大小"""
+
+class Segment:
+    """一段待下載的位元組範圍 [start, end)，pos 為目前已寫入的位置"""
+    def __init__(self, start, end):
+        self.start = start
+        self.pos = start
+        self.end = end
+
+    @property
+    def remaining(self):
+        return self.end - self.pos
+
+class SegmentedDownloader:
+    """
+    多連線分段下載引擎：
+    將檔案切成多個位元組範圍，以 N 條連線同時下載並寫入預先配置好大小的檔案對應位置。
+    區段佇列取完後，閒置的連線會把進行中剩餘最多的區段切一半接手（work stealing），
+    避免最後被單一慢速連線拖住。
+    """
+    def __init__(self, connections=DEFAULT_CONNECTIONS, chunk_size=DEFAULT_CHUNK_SIZE, session=None, timeout=30):
+        self.connections = max(1, connections)
+        self.chunk_size = max(MIN_STEAL_SIZE, chunk_size)
+        self.timeout = timeout
+        self._session = session
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """第一次下載時才載入 requests 並建立連線池，避免拖慢程式啟動"""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.connections * 2)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def probe(self, url, headers=None):
+        """以 Range: bytes=0-0 詢問伺服器，回傳 (檔案大小, ETag)；不支援 Range 時拋出 RangeNotSupported"""
+        request_headers = dict(headers or {})
+        request_headers["Range"] = "bytes=0-0"
+        with self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code != 206 or "/" not in content_range:
+                raise RangeNotSupported(url)
+            total = content_range.rsplit("/", 1)[1]
+            if not total.isdigit():
+                raise RangeNotSupported(url)
+            return int(total), response.headers.get("ETag")
+
+    def download(self, url, output_path, total_size=None, headers=None, progress_callback=None, resume_key=None):
+        """
+        下載 url 至 output_path，並以 <output_path>.journal 記錄進度以便中斷後續傳。
+        total_size: 已知的檔案大小（可省略，省略時先以 probe 取得）
+        progress_callback: 回呼函式 progress_callback(已下載位元組, 總位元組)
+        resume_key: 續傳時用來辨識同一份檔案的鍵（簽章 URL 每次解析都會不同，預設仍使用 url）
+        """
+        etag = None
+        if total_size is None:
+            total_size, etag = self.probe(url, headers)
+
+        journal = TransferJournal(output_path)
+        key = resume_key or url
+        if journal.load(key, total_size):
+            logger.info(f"Resuming {os.path.basename(output_path)} from {journal.completed_bytes()} / {total_size} bytes")
+        else:
+            journal.reset(key, url, total_size, etag)
+
+        headers = dict(headers or {})
+        if journal.etag:
+            # 伺服器端檔案已變更時會回傳 200 而非 206，下載即失敗並改為重新下載
+            headers["If-Range"] = journal.etag
+
+        segments = []
+        for range_start, range_end in journal.missing_ranges():
+            segments.extend(
+                Segment(start, min(start + self.chunk_size, range_end))
+                for start in range(range_start, range_end, self.chunk_size)
+            )
+        try:
+            self._run(url, output_path, total_size, segments, headers, progress_callback, journal)
+        except Exception:
+            journal.flush()
+            raise
+        journal.remove()
+        return output_path
+
+    def _run(self, url, output_path, total_size, segments, headers, progress_callback, journal=None):
+        # 預先配置檔案大小，各連線直接寫入自己負責的位置（續傳時保留已下載的內容）
+        mode = "r+b" if os.path.exists(output_path) else "wb"
+        with open(output_path, mode) as f:
+            f.truncate(total_size)
+
+        state = _TransferState(segments, total_size - sum(seg.remaining for seg in segments))
+        workers = [
+            threading.Thread(
+                target=self._worker,
+                args=(url, output_path, headers, state, progress_callback, total_size, journal),
+                daemon=True
+            )
+            for _ in range(min(self.connections, max(len(segments), 1)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if state.error is not None:
+            raise state.error
+
+    def _worker(self, url, output_path, headers, state, progress_callback, total_size, journal):
+        with open(output_path, "r+b") as f:
+            while state.error is None:
+                segment = state.next_segment()
+                if segment is None:
+                    return
+                for attempt in range(MAX_RETRIES):
+                    try:
+                        self._fetch(url, f, segment, headers, state, progress_callback, total_size, journal)
+                        break
+                    except Exception as e:
+                        logger.warning(f"Segment {segment.pos}-{segment.end} failed (attempt {attempt + 1}): {e}")
+                        if attempt == MAX_RETRIES - 1:
+                            state.fail(e)
+                state.finish(segment)
+
+    def _fetch(self, url, f, segment, headers, state, progress_callback, total_size, journal):
+        if segment.remaining <= 0:
+            return
+        request_headers = dict(headers or {})
+        request_headers["Range"] = f"bytes={segment.pos}-{segment.end - 1}"
+        with self.session.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise RangeNotSupported(url)
+            if journal is not None:
+                journal.set_etag(response.headers.get("ETag"))
+            for data in response.iter_content(READ_SIZE):
+                # 區段可能已被其他連線切走後半段，只寫到目前的 end 為止
+                with state.lock:
+                    length = min(len(data), segment.end - segment.pos)
+                    position = segment.pos
+                if length <= 0:
+                    break
+                f.seek(position)
+                f.write(data[:length])
+                f.flush()  # 寫入後才記錄到日誌，避免中斷時日誌記載了尚未落地的資料
+                with state.lock:
+                    segment.pos += length
+                    state.downloaded += length
+                    downloaded = state.downloaded
+                    done = segment.pos >= segment.end
+                if journal is not None:
+                    journal.add_range(position, position + length)
+                if progress_callback:
+                    progress_callback(downloaded, total_size)
+                if done:
+                    break
+        if segment.remaining > 0:
+            raise IOError(f"Connection closed early at byte {segment.pos}")
+
+class _TransferState:
+    """分段下載過程的共享狀態：待下載佇列、進行中的區段與已下載位元組數"""
+    def __init__(self, segments, downloaded=0):
+        self.lock = threading.Lock()
+        self.pending = deque(seg for seg in segments if seg.remaining > 0)
+        self.active = []
+        self.downloaded = downloaded
+        self.error = None
+
+    def next_segment(self):
+        with self.lock:
+            if self.pending:
+                segment = self.pending.popleft()
+                self.active.append(segment)
+                return segment
+            # 佇列已空：從剩餘最多的進行中區段切出後半段
+            if not self.active:
+                return None
+            victim = max(self.active, key=lambda seg: seg.remaining)
+            if victim.remaining < 2 * MIN_STEAL_SIZE:
+                return None
+            middle = victim.pos + victim.remaining // 2
+            segment = Segment(middle, victim.end)
+            victim.end = middle
+            self.active.append(segment)
+            return segment
+
+    def finish(self, segment):
+        with self.lock:
+            if segment in self.active:
+                self.active.remove(segment)
+
+    def fail(self, error):
+        with self.lock:
+            if self.error is None:
+                self.error = error
@@ -0,0 +1,192 @@
+'''
+啟動效能量測：
+    python startup_benchmark.py [--output startup_benchmark.json] [--budget budget.json] [--baseline previous.json]
+
+1. 以子行程執行 `python -X importtime -c "import main"`，記錄各模組的匯入耗時
+2. 在本行程建立 MainApp（視窗於進入事件迴圈前即 withdraw，不會顯示），
+   記錄建構時間、各頁面建構時間與第一次進入 idle 的時間，之後依序建立其餘頁面
+3. 結果寫成 JSON，可與預算（budget）及先前的結果（baseline）比較；超出預算時以結束代碼 1 離開
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+DEFAULT_OUTPUT = "startup_benchmark.json"
+# 預設預算（毫秒）；可用 --budget 指定 JSON 檔覆寫，格式與此相同
+DEFAULT_BUDGET = {
+    "import_main_ms": 500,
+    "main_app_init_ms": 500,
+    "first_idle_ms": 800,
+    "pages_ms": {"HomePage": 200, "Page1": 300, "Page2": 400, "Page3": 300, "Page4": 100},
+}
+TOP_MODULES = 25
+
+def measure_imports():
+    """以 -X importtime 在全新的直譯器中匯入 main，回傳 (總耗時毫秒, 依累計耗時排序的模組清單)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace"
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("import main failed:\n" + "\n".join(errors[-10:]))
+    modules = []
+    for line in result.stderr.splitlines():
+        # 格式：import time:   self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+        except ValueError:
+            continue
+    total = next((m["cumulative_ms"] for m in modules if m["module"] == "main"), None)
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return total, modules[:TOP_MODULES]
+
+def measure_startup():
+    """建立 MainApp 並量測建構、各頁面建構與第一次 idle 的時間（毫秒）"""
+    start = time.perf_counter()
+    import main
+    import_ms = (time.perf_counter() - start) * 1000
+
+    page_ms = {}
+    original_get_frame = main.MainApp.get_frame
+
+    def timed_get_frame(app, page):
+        if page in app.frames:
+            return app.frames[page]
+        page_start = time.perf_counter()
+        frame = original_get_frame(app, page)
+        page_ms[page.__name__] = (time.perf_counter() - page_start) * 1000
+        return frame
+
+    main.MainApp.get_frame = timed_get_frame
+    try:
+        init_start = time.perf_counter()
+        # 不還原未完成的工作：量測時不應清除佇列、刪除暫存檔或開始下載
+        app = main.MainApp(resume_jobs=False)
+        # 在進入事件迴圈前隱藏，視窗不會被映射到畫面上
+        app.withdraw()
+        init_ms = (time.perf_counter() - init_start) * 1000
+        result = {}
+
+        def on_first_idle():
+            result["first_idle_ms"] = (time.perf_counter() - init_start) * 1000
+            # 其餘頁面原本是第一次切換時才建立，在此逐一建立以量測其建構時間
+            for page in (main.Page1, main.Page2, main.Page3, main.Page4):
+                app.get_frame(page)
+            app.after(0, app.destroy)
+
+        app.after_idle(on_first_idle)
+        app.mainloop()
+    finally:
+        main.MainApp.get_frame = original_get_frame
+
+    return {
+        "import_main_inprocess_ms": import_ms,
+        "main_app_init_ms": init_ms,
+        "first_idle_ms": result.get("first_idle_ms"),
+        "pages_ms": page_ms,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def check_budget(report, budget):
+    """回傳超出預算的項目清單"""
+    violations = []
+    metrics = {
+        "import_main_ms": report["imports"]["import_main_ms"],
+        "main_app_init_ms": report["startup"]["main_app_init_ms"],
+        "first_idle_ms": report["startup"]["first_idle_ms"],
+    }
+    for name, limit in budget.items():
+        if name == "pages_ms":
+            for page, page_limit in limit.items():
+                value = report["startup"]["pages_ms"].get(page)
+                if value is not None and value > page_limit:
+                    violations.append(f"{page}: {value:.1f} ms > {page_limit} ms")
+        elif metrics.get(name) is not None and metrics[name] > limit:
+            violations.append(f"{name}: {metrics[name]:.1f} ms > {limit} ms")
+    return violations
+
+def compare_baseline(report, baseline):
+    """列出與先前結果的差異"""
+    lines = []
+    pairs = [
+        ("import_main_ms", report["imports"]["import_main_ms"], baseline["imports"].get("import_main_ms")),
+        ("main_app_init_ms", report["startup"]["main_app_init_ms"], baseline["startup"].get("main_app_init_ms")),
+        ("first_idle_ms", report["startup"]["first_idle_ms"], baseline["startup"].get("first_idle_ms")),
+    ]
+    for page, value in report["startup"]["pages_ms"].items():
+        pairs.append((page, value, baseline["startup"].get("pages_ms", {}).get(page)))
+    for name, current, previous in pairs:
+        if current is None or previous is None:
+            continue
+        lines.append(f"{name}: {previous:.1f} -> {current:.1f} ms ({current - previous:+.1f})")
+    return lines
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Measure Video DownloadErm startup time")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file to write the results to")
+    parser.add_argument("--budget", help="JSON file overriding the default budget (milliseconds)")
+    parser.add_argument("--baseline", help="previous result JSON to compare against")
+    args = parser.parse_args()
+
+    import_total, modules = measure_imports()
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "imports": {"import_main_ms": import_total, "modules": modules},
+        "startup": measure_startup(),
+    }
+
+    budget = DEFAULT_BUDGET
+    if args.budget:
+        with open(args.budget, "r", encoding="utf-8") as f:
+            budget = json.load(f)
+    report["budget"] = budget
+    report["violations"] = check_budget(report, budget)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+
+    print(f"import main: {import_total} ms")
+    for module in modules[:10]:
+        print(f"  {module['cumulative_ms']:8.1f} ms  {module['module']}")
+    startup = report["startup"]
+    print(f"MainApp(): {startup['main_app_init_ms']:.1f} ms, first idle: {startup['first_idle_ms']:.1f} ms")
+    for page, value in startup["pages_ms"].items():
+        print(f"  {page}: {value:.1f} ms")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            for line in compare_baseline(report, json.load(f)):
+                print(line)
+    if report["violations"]:
+        print("Budget exceeded:")
+        for violation in report["violations"]:
+            print(f"  {violation}")
+        return 1
+    print(f"Within budget, results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,98 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging_config import setup_logger
+from segmented_downloader import SegmentedDownloader, RangeNotSupported, DEFAULT_CONNECTIONS, DEFAULT_CHUNK_SIZE
+from transfer_journal import TransferJournal
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+# 分段下載引擎；連線數設為 1 以下時停用，改回 pytubefix 內建的單連線下載
+transfer_engine = SegmentedDownloader(DEFAULT_CONNECTIONS, DEFAULT_CHUNK_SIZE)
+segmented_enabled = True
+
+def configure_transfer(connections=DEFAULT_CONNECTIONS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """依設定檔調整分段下載的連線數與區段大小"""
+    global transfer_engine, segmented_enabled
+    segmented_enabled = connections > 1
+    transfer_engine = SegmentedDownloader(connections, chunk_size)
+
+class CombinedProgress:
+    """
+    多個串流同時下載時，以實際位元組數合併計算整體進度。
+    on_progress 的簽章與 pytubefix 的 on_progress_callback 相同，
+    回報給 progress_callback 的值為 (已下載位元組 / 總位元組) * scale。
+    """
+    def __init__(self, streams, progress_callback=None, scale=1.0):
+        self.progress_callback = progress_callback
+        self.scale = scale
+        self.totals = {stream.itag: stream.filesize or 0 for stream in streams}
+        self.downloaded = dict.fromkeys(self.totals, 0)
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self):
+        return sum(self.totals.values())
+
+    def on_progress(self, stream, chunk, bytes_remaining):
+        with self._lock:
+            if stream.itag not in self.totals:
+                return
+            total = self.totals[stream.itag]
+            self.downloaded[stream.itag] = total - bytes_remaining
+            fraction = sum(self.downloaded.values()) / self.total_bytes if self.total_bytes else 0
+        if self.progress_callback:
+            self.progress_callback(fraction * self.scale)
+
+def download_stream(stream, output_dir, filename, on_progress=None):
+    """
+    下載單一 pytubefix 串流。啟用分段下載時以多連線引擎取得 stream.url，
+    伺服器不支援 Range 時才退回 pytubefix 內建下載；其他錯誤（例如重試後仍斷線）保留續傳日誌與部分檔案並拋出，
+    下次嘗試時以 If-Range 從中斷處繼續。on_progress 的簽章與 pytubefix 的 on_progress_callback 相同。
+    """
+    output_path = os.path.join(output_dir, filename)
+    if segmented_enabled and stream.filesize:
+        def on_bytes(downloaded, total):
+            if on_progress:
+                on_progress(stream, None, total - downloaded)
+        # 簽章 URL 每次解析都不同，改以 itag、大小與串流版本辨識同一份檔案以便續傳
+        resume_key = f"{stream.itag}:{stream.filesize}:{stream.last_Modified}"
+        try:
+            return transfer_engine.download(stream.url, output_path, stream.filesize,
+                                            progress_callback=on_bytes, resume_key=resume_key)
+        except RangeNotSupported as e:
+            logger.warning(f"Range requests not supported for itag {stream.itag}, falling back: {e}")
+            # 預先配置的檔案大小已與完整檔案相同，需先移除，否則 pytubefix 會視為已下載而略過
+            TransferJournal(output_path).remove()
+            if os.path.exists(output_path):
+                os.remove(output_path)
+        except Exception as e:
+            logger.warning(f"Segmented download of itag {stream.itag} interrupted, keeping journal for resume: {e}")
+            raise
+    return stream.download(output_path=output_dir, filename=filename)
+
+def download_streams(downloads, extra_tasks=(), on_progress=None):
+    """
+    同時下載多個 pytubefix 串流，並可一併執行其他獨立工作（例如字幕下載）。
+    downloads: [(stream, output_dir, filename), ...]
+    extra_tasks: 無參數的可呼叫物件，與串流下載並行執行
+    on_progress: 分段下載時的進度回呼（pytubefix 內建下載仍走 YouTube 物件註冊的回呼）
+    全部完成後才回傳；任一串流下載失敗時拋出該例外。
+    """
+    workers = len(downloads) + len(extra_tasks)
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="stream") as executor:
+        stream_futures = [
+            executor.submit(download_stream, stream, output_dir, filename, on_progress)
+            for stream, output_dir, filename in downloads
+        ]
+        extra_futures = [executor.submit(task) for task in extra_tasks]
+        results = [future.result() for future in stream_futures]
+        for future in extra_futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Side task failed: {e}")
+    return results
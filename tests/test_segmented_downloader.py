@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segmented_downloader import SegmentedDownloader, MIN_STEAL_SIZE
+from transfer_journal import TransferJournal
+import stream_download
+
+MIB = 1024 * 1024
+
+class RangeServer:
+    """
+    支援 Range 的本機 HTTP 伺服器，記錄每個請求的範圍與實際送出的位元組數。
+    slow_start：從此位置開始的請求以低速傳送（用來觸發 work stealing）
+    cut_at：送到此絕對位置就中斷連線（用來模擬下載中斷）
+    """
+    def __init__(self, content):
+        self.content = content
+        self.ranges = []
+        self.bytes_sent = 0
+        self.slow_start = None
+        self.cut_at = None
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if not match:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(server.content)))
+                    self.end_headers()
+                    self.wfile.write(server.content)
+                    return
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else len(server.content) - 1
+                with server._lock:
+                    server.ranges.append((start, end + 1))
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(server.content)}")
+                self.send_header("Content-Length", str(end + 1 - start))
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                position = start
+                while position <= end:
+                    chunk_end = min(position + 64 * 1024, end + 1)
+                    if server.cut_at is not None:
+                        chunk_end = min(chunk_end, server.cut_at)
+                        if chunk_end <= position:
+                            return  # 中斷連線，用戶端會收到不完整的回應
+                    try:
+                        self.wfile.write(server.content[position:chunk_end])
+                    except (BrokenPipeError, ConnectionResetError):
+                        return
+                    with server._lock:
+                        server.bytes_sent += chunk_end - position
+                    position = chunk_end
+                    if server.slow_start is not None and start == server.slow_start:
+                        time.sleep(0.02)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/file.bin"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def data_ranges(self):
+        """排除 probe（bytes=0-0）之外的請求範圍"""
+        with self._lock:
+            return [r for r in self.ranges if r != (0, 1)]
+
+@pytest.fixture
+def content():
+    return os.urandom(8 * MIB)
+
+def test_probe_and_segment_split(tmp_path, content):
+    output = tmp_path / "out.bin"
+    with RangeServer(content) as server:
+        downloader = SegmentedDownloader(connections=4, chunk_size=2 * MIB)
+        assert downloader.probe(server.url) == (len(content), '"v1"')
+        downloader.download(server.url, str(output))
+        ranges = sorted(server.data_ranges())
+
+    assert output.read_bytes() == content
+    # 每個 chunk 各有一個請求；閒置連線切走的後半段仍落在原本的 chunk 內
+    starts = {start for start, _ in ranges}
+    assert {0, 2 * MIB, 4 * MIB, 6 * MIB} <= starts
+    for start, end in ranges:
+        assert start // (2 * MIB) == (end - 1) // (2 * MIB)
+    # 下載完成後刪除續傳日誌
+    assert not os.path.exists(str(output) + ".journal")
+
+def test_work_stealing_splits_slow_segment(tmp_path, content):
+    output = tmp_path / "out.bin"
+    with RangeServer(content) as server:
+        # 第一段以低速傳送；第二段很快完成，閒置的連線應切走第一段剩餘的後半部
+        server.slow_start = 0
+        downloader = SegmentedDownloader(connections=2, chunk_size=4 * MIB)
+        downloader.download(server.url, str(output), total_size=len(content))
+        ranges = server.data_ranges()
+
+    assert output.read_bytes() == content
+    stolen = [(start, end) for start, end in ranges if start not in (0, 4 * MIB)]
+    assert stolen, ranges
+    for start, end in stolen:
+        assert 0 < start < 4 * MIB
+        assert end - start >= MIN_STEAL_SIZE
+
+def test_resume_from_journal_after_failed_run(tmp_path, content):
+    output = tmp_path / "out.bin"
+    with RangeServer(content) as server:
+        server.cut_at = 5 * MIB
+        downloader = SegmentedDownloader(connections=1, chunk_size=8 * MIB)
+        with pytest.raises(Exception):
+            downloader.download(server.url, str(output), total_size=len(content), resume_key="video")
+
+        journal = TransferJournal(str(output))
+        assert journal.load("video", len(content))
+        assert journal.missing_ranges() == [(5 * MIB, 8 * MIB)]
+
+        server.cut_at = None
+        server.bytes_sent = 0
+        server.ranges.clear()
+        downloader.download(server.url, str(output), total_size=len(content), resume_key="video")
+        resumed_ranges = server.data_ranges()
+        resumed_bytes = server.bytes_sent
+
+    assert output.read_bytes() == content
+    assert resumed_ranges == [(5 * MIB, 8 * MIB)]
+    assert resumed_bytes == 3 * MIB
+    assert not os.path.exists(str(output) + ".journal")
+
+class FakeStream:
+    """只具備 download_stream 需要之屬性的 pytubefix 串流替身"""
+    def __init__(self, url, filesize):
+        self.url = url
+        self.filesize = filesize
+        self.itag = 140
+        self.last_Modified = "1"
+        self.fallback_calls = 0
+
+    def download(self, output_path, filename):
+        self.fallback_calls += 1
+        return os.path.join(output_path, filename)
+
+def test_download_stream_keeps_journal_on_network_error(tmp_path, content):
+    with RangeServer(content) as server:
+        server.cut_at = 5 * MIB
+        stream = FakeStream(server.url, len(content))
+        with pytest.raises(Exception):
+            stream_download.download_stream(stream, str(tmp_path), "audio.m4a")
+        # 中斷時不退回單連線下載，日誌保留供下次續傳
+        assert stream.fallback_calls == 0
+        assert os.path.exists(str(tmp_path / "audio.m4a") + ".journal")
+
+        server.cut_at = None
+        server.ranges.clear()
+        stream_download.download_stream(stream, str(tmp_path), "audio.m4a")
+        resumed_ranges = server.data_ranges()
+
+    assert stream.fallback_calls == 0
+    assert (tmp_path / "audio.m4a").read_bytes() == content
+    assert all(start >= 5 * MIB for start, _ in resumed_ranges)
@@ -0,0 +1,155 @@
+import os
+import io
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+CACHE_DIR = "thumbnail_cache"
+INDEX_FILE = "index.json"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+THUMBNAIL_SIZE = (400, 300)
+
+class ThumbnailService:
+    """
+    共用的封面圖服務：
+    - 以連線池化、keep-alive 的 requests.Session 下載
+    - 以內容雜湊命名的磁碟快取（index.json 對應 URL -> 雜湊），依總大小淘汰最久未使用者
+    - 在背景執行緒以 draft 模式直接解碼成目標尺寸，記憶體只保留縮小後的圖片
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, size=THUMBNAIL_SIZE, max_workers=2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = size
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._max_workers = max_workers
+        self._session = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self._index = self._load_index()
+
+    @property
+    def session(self):
+        """第一次下載封面時才載入 requests 並建立連線池"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self._max_workers * 2, max_retries=2)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            return self._session
+
+    def submit(self, url, callback):
+        """
+        在背景執行緒載入封面圖，完成後以 callback(image) 回傳；失敗時 image 為 None。
+        callback 於背景執行緒呼叫，更新 UI 時需自行透過 after() 回到主執行緒。
+        """
+        def task():
+            try:
+                image = self.load(url)
+            except Exception as e:
+                logger.warning(f"Thumbnail load failed: {e}")
+                image = None
+            callback(image)
+        return self._executor.submit(task)
+
+    def load(self, url):
+        """取得已縮放至目標尺寸的 PIL Image，優先使用磁碟快取"""
+        data = self._read_cached(url)
+        if data is None:
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+            data = response.content
+            self._store(url, data)
+        return self._decode(data)
+
+    def _decode(self, data):
+        from PIL import Image  # 延遲載入，縮短程式啟動時間
+        img = Image.open(io.BytesIO(data))
+        # JPEG 可在解碼時直接以 1/2、1/4、1/8 縮小，省下完整解碼的時間與記憶體
+        img.draft("RGB", self.size)
+        img = img.convert("RGB")
+        if img.size != self.size:
+            img = img.resize(self.size, Image.LANCZOS)
+        return img
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest + ".img")
+
+    def _read_cached(self, url):
+        with self._lock:
+            digest = self._index.get(url)
+        if digest is None:
+            return None
+        path = self._blob_path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # 更新存取時間供 LRU 淘汰使用
+            return data
+        except OSError:
+            with self._lock:
+                self._index.pop(url, None)
+            return None
+
+    def _store(self, url, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        try:
+            if not os.path.exists(path):
+                temp_path = path + ".tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            with self._lock:
+                self._index[url] = digest
+                self._evict()
+                self._save_index()
+        except OSError as e:
+            logger.warning(f"Failed to cache thumbnail: {e}")
+
+    def _evict(self):
+        blobs = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".img"):
+                stat = entry.stat()
+                blobs.append((stat.st_mtime, stat.st_size, entry.name[:-4]))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        blobs.sort()
+        removed = set()
+        for _, size, digest in blobs:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                continue
+            total -= size
+            removed.add(digest)
+        self._index = {u: d for u, d in self._index.items() if d not in removed}
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        temp_path = self._index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self._index_path)
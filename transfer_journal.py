@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import threading
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+SAVE_INTERVAL = 1.0  # 兩次寫入日誌之間的最短間隔（秒）
+
+class TransferJournal:
+    """
+    單一下載的續傳日誌，與目標檔案放在一起（<檔名>.journal）。
+    記錄 URL、識別鍵、預期大小、ETag 與已完成的位元組範圍，
+    程式中斷後重新執行同一工作時，只需以 Range 補抓缺少的部分。
+    """
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.path = output_path + JOURNAL_SUFFIX
+        self.key = None
+        self.url = None
+        self.size = None
+        self.etag = None
+        self.completed = []  # 已排序且不重疊的 [start, end) 範圍
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    def load(self, key, size):
+        """
+        讀取既有日誌；識別鍵與大小相符且暫存檔仍在時回傳 True，
+        否則清空狀態並回傳 False（代表需從頭下載）。
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("key") != key or data.get("size") != size:
+            return False
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) != size:
+            return False
+        self.key = key
+        self.url = data.get("url")
+        self.size = size
+        self.etag = data.get("etag")
+        self.completed = [list(r) for r in data.get("completed", [])]
+        return True
+
+    def reset(self, key, url, size, etag=None):
+        with self._lock:
+            self.key = key
+            self.url = url
+            self.size = size
+            self.etag = etag
+            self.completed = []
+            self._save()
+
+    def set_etag(self, etag):
+        with self._lock:
+            if etag and not self.etag:
+                self.etag = etag
+                self._save()
+
+    def add_range(self, start, end):
+        """記錄 [start, end) 已寫入，並與相鄰範圍合併"""
+        with self._lock:
+            merged = []
+            placed = False
+            for r_start, r_end in self.completed:
+                if r_end < start:
+                    merged.append([r_start, r_end])
+                elif end < r_start:
+                    if not placed:
+                        merged.append([start, end])
+                        placed = True
+                    merged.append([r_start, r_end])
+                else:
+                    start, end = min(start, r_start), max(end, r_end)
+            if not placed:
+                merged.append([start, end])
+            merged.sort()
+            self.completed = merged
+            if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+                self._save()
+
+    def completed_bytes(self):
+        with self._lock:
+            return sum(end - start for start, end in self.completed)
+
+    def missing_ranges(self):
+        """回傳尚未下載的 [start, end) 範圍"""
+        with self._lock:
+            missing = []
+            position = 0
+            for start, end in self.completed:
+                if start > position:
+                    missing.append((position, start))
+                position = max(position, end)
+            if position < self.size:
+                missing.append((position, self.size))
+            return missing
+
+    def flush(self):
+        with self._lock:
+            self._save()
+
+    def remove(self):
+        """下載完成後刪除日誌"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _save(self):
+        data = {
+            "key": self.key,
+            "url": self.url,
+            "size": self.size,
+            "etag": self.etag,
+            "completed": self.completed,
+        }
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+            self._last_save = time.monotonic()
+        except OSError as e:
+            logger.warning(f"Failed to write transfer journal: {e}")
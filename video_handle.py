@@ -0,0 +1,90 @@
+import copy
+import time
+from urllib.parse import urlparse, parse_qs
+from logging_config import setup_logger
+from info_cache import extract_video_id
+from ydl_pool import ydl_pool
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+EXPIRE_MARGIN = 120  # 簽章 URL 剩餘有效時間少於此秒數即視為過期
+
+INFO_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'noplaylist': True,
+}
+
+def _url_expire(url):
+    """取出 googlevideo 簽章 URL 中的 expire 參數（Unix 時間），沒有則回傳 None"""
+    try:
+        values = parse_qs(urlparse(url).query).get("expire")
+        return int(values[0]) if values else None
+    except (TypeError, ValueError):
+        return None
+
+class VideoHandle:
+    """
+    單一影片解析結果的包裝，讓查詢資訊與下載共用同一次解析。
+    source 依下載器不同為 pytubefix 的 YouTube 物件或 yt_dlp 的 info dict。
+    """
+    def __init__(self, url, downloader, source):
+        self.url = url
+        self.downloader = downloader
+        self.source = source
+        self.video_id = extract_video_id(url)
+        self.extracted_at = time.time()
+        self._expires_at = None
+
+    @property
+    def title(self):
+        if self.downloader == 'pytubefix':
+            return self.source.title
+        return self.source.get('title', 'Unknown Title')
+
+    def matches(self, url, downloader):
+        return downloader == self.downloader and extract_video_id(url) == self.video_id
+
+    def expires_at(self):
+        """所有串流 URL 中最早的到期時間，無法得知時回傳 None"""
+        if self._expires_at is None:
+            if self.downloader == 'pytubefix':
+                urls = [stream.url for stream in self.source.streams]
+            else:
+                urls = [fmt.get('url', '') for fmt in self.source.get('formats', [])]
+            expires = [e for e in map(_url_expire, urls) if e]
+            self._expires_at = min(expires) if expires else None
+        return self._expires_at
+
+    def is_expired(self):
+        expires_at = self.expires_at()
+        if expires_at is None:
+            # 無法判斷時以 YouTube 簽章 URL 常見的 6 小時有效期估算
+            return time.time() - self.extracted_at > 6 * 3600 - EXPIRE_MARGIN
+        return expires_at - time.time() < EXPIRE_MARGIN
+
+    def revalidated(self):
+        """簽章 URL 已過期時重新解析並回傳新的 handle，否則回傳自己"""
+        if not self.is_expired():
+            return self
+        logger.info(f"Signed stream URLs expired for {self.video_id}, extracting again")
+        return extract_video(self.url, self.downloader)
+
+    def info_copy(self):
+        """yt_dlp 在處理 info dict 時會修改內容，下載時使用複本"""
+        return copy.deepcopy(self.source)
+
+def extract_video(url, downloader):
+    """解析影片並回傳 VideoHandle"""
+    if downloader == 'pytubefix':
+        from pytubefix import YouTube  # 延遲載入，縮短程式啟動時間
+        return VideoHandle(url, downloader, YouTube(url))
+    elif downloader == 'yt_dlp':
+        with ydl_pool.lease(INFO_OPTS) as ydl:
+            info = ydl.extract_info(url, download=False)
+        return VideoHandle(url, downloader, info)
+    raise ValueError(f"Unknown downloader: {downloader}")
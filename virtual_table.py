@@ -0,0 +1,213 @@
+import customtkinter as ctk
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+DEFAULT_ROW_HEIGHT = 28
+# 以字元數估算欄寬可容納的文字長度（避免每次量測字型），超出的部分以 … 省略
+AVERAGE_CHAR_PIXELS = 7
+
+class ListTableModel:
+    """
+    VirtualTable 的資料來源：直接引用外部的 list（每筆為 dict），依 keys 取出各欄顯示的值。
+    選取狀態與列的 widget 無關，捲動回收 widget 時不會遺失，記錄方式為：
+    索引小於 _all_below 的列預設為選取，_flipped 中的索引與預設相反。
+    因此切換單列為 O(1)，全選/全部取消只需清空 _flipped（O(k)，k 為先前個別切換的列數），
+    全選之後才加入的列不會被選取。
+    """
+    def __init__(self, items, keys):
+        self.items = items
+        self.keys = keys
+        self._all_below = 0
+        self._flipped = set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def row_values(self, index):
+        item = self.items[index]
+        return [str(item.get(key, "")) for key in self.keys]
+
+    def is_selected(self, index):
+        return (index < self._all_below) != (index in self._flipped)
+
+    def toggle(self, index):
+        if index in self._flipped:
+            self._flipped.discard(index)
+        else:
+            self._flipped.add(index)
+
+    def select_all(self):
+        self._flipped.clear()
+        self._all_below = len(self.items)
+
+    def clear_selection(self):
+        self._flipped.clear()
+        self._all_below = 0
+
+    def selected_count(self):
+        flipped_inside = sum(1 for index in self._flipped if index < self._all_below)
+        return self._all_below - flipped_inside + (len(self._flipped) - flipped_inside)
+
+    def all_selected(self):
+        return bool(self.items) and self.selected_count() == len(self.items)
+
+    def delete_selected(self):
+        """
+        一次刪除所有選取的列：以一次走訪重建清單（原地替換，外部引用的 list 仍有效），
+        不逐列 del（每次 O(n)），回傳被刪除的項目。
+        """
+        kept, removed = [], []
+        for index, item in enumerate(self.items):
+            (removed if self.is_selected(index) else kept).append(item)
+        self.items[:] = kept
+        self.clear_selection()
+        return removed
+
+class VirtualTable(ctk.CTkFrame):
+    """
+    只繪製可見列的表格。
+    列的 widget 數量只與可見高度有關（約 可見列數 × 欄數），捲動時重複使用同一批 widget、
+    只更新其文字與顏色；資料新增/刪除時只需 refresh()，不會為每一列建立 widget，
+    上萬筆資料時插入與捲動仍維持順暢。
+    """
+    def __init__(self, master, model, column_widths, command=None, row_height=DEFAULT_ROW_HEIGHT,
+                 hover_color="skyblue", **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.column_widths = list(column_widths)
+        self.command = command
+        self.row_height = row_height
+        self.hover_color = hover_color
+        self.first_row = 0  # 目前顯示在最上方的資料列索引
+        self._row_colors = (ctk.ThemeManager.theme["CTkFrame"]["fg_color"],
+                            ctk.ThemeManager.theme["CTkFrame"]["top_fg_color"])
+        self._slots = []  # 每個可見列的 cell widget
+        self._slot_state = []  # 每個可見列上次繪製的 (文字, 是否選取, 奇偶)，未變動時不重新設定
+        self._visible_rows = 0
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.header_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.header_frame.grid(row=0, column=0, sticky="ew")
+        self.header_cells = []
+        for col, width in enumerate(self.column_widths):
+            cell = ctk.CTkLabel(self.header_frame, text="", width=width, height=row_height, corner_radius=0)
+            cell.grid(row=0, column=col, padx=1, pady=1)
+            self.header_cells.append(cell)
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        # 大小由外層決定，不隨內部列數改變
+        self.body.grid_propagate(False)
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+    # ------------------------------
+    # 對外介面
+    # ------------------------------
+    def set_headers(self, texts, fg_color=None):
+        for cell, text in zip(self.header_cells, texts):
+            if fg_color is None:
+                cell.configure(text=text)
+            else:
+                cell.configure(text=text, fg_color=fg_color)
+
+    def refresh(self):
+        """資料或選取狀態變動後呼叫，只重繪可見範圍"""
+        total = len(self.model)
+        self.first_row = max(0, min(self.first_row, total - self._visible_rows))
+        for slot, cells in enumerate(self._slots[:self._visible_rows]):
+            index = self.first_row + slot
+            if index < total:
+                state = (tuple(self.model.row_values(index)), self.model.is_selected(index), index % 2)
+            else:
+                state = None
+            if state == self._slot_state[slot]:
+                continue
+            self._slot_state[slot] = state
+            if state is None:
+                for cell in cells:
+                    cell.configure(text="", fg_color="transparent")
+                continue
+            values, selected, parity = state
+            color = self.hover_color if selected else self._row_colors[parity]
+            for col, cell in enumerate(cells):
+                cell.configure(text=self._elide(values[col], self.column_widths[col]), fg_color=color)
+        self._update_scrollbar(total)
+
+    # ------------------------------
+    # 內部實作
+    # ------------------------------
+    def _elide(self, text, width):
+        max_chars = max(width // AVERAGE_CHAR_PIXELS, 4)
+        return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+    def _on_resize(self, event):
+        row_pixels = self._apply_widget_scaling(self.row_height) + 2
+        visible = max(int(event.height // row_pixels), 1)
+        if visible == self._visible_rows:
+            return
+        while len(self._slots) < visible:
+            self._create_slot(len(self._slots))
+        for slot, cells in enumerate(self._slots):
+            for col, cell in enumerate(cells):
+                if slot < visible:
+                    cell.grid(row=slot, column=col, padx=1, pady=1)
+                else:
+                    cell.grid_remove()
+        self._visible_rows = visible
+        self.refresh()
+
+    def _create_slot(self, slot):
+        cells = []
+        for col, width in enumerate(self.column_widths):
+            cell = ctk.CTkLabel(self.body, text="", width=width, height=self.row_height,
+                                corner_radius=0, anchor="w")
+            cell.bind("<Button-1>", lambda event, s=slot, c=col: self._on_click(s, c))
+            self._bind_wheel(cell)
+            cells.append(cell)
+        self._slots.append(cells)
+        self._slot_state.append(None)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        # X11 以 Button-4/5 表示滾輪
+        widget.bind("<Button-4>", lambda event: self._scroll_rows(-3))
+        widget.bind("<Button-5>", lambda event: self._scroll_rows(3))
+
+    def _on_wheel(self, event):
+        self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _scroll_rows(self, rows):
+        self.first_row += rows
+        self.refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        total = len(self.model)
+        if action == "moveto":
+            self.first_row = int(float(value) * total)
+        elif action == "scroll":
+            step = int(float(value))
+            step = (step > 0) - (step < 0)
+            self.first_row += step * (self._visible_rows if unit == "pages" else 3)
+        self.refresh()
+
+    def _update_scrollbar(self, total):
+        if total <= self._visible_rows or total == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first_row / total, (self.first_row + self._visible_rows) / total)
+
+    def _on_click(self, slot, column):
+        index = self.first_row + slot
+        if index >= len(self.model) or self.command is None:
+            return
+        self.command({"row": index, "column": column, "value": self.model.row_values(index)[column]})
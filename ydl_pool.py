@@ -0,0 +1,113 @@
+import json
+import threading
+from contextlib import contextmanager
+from logging_config import setup_logger
+
+# ------------------------------
+# 初始化 Logger
+# ------------------------------
+logger = setup_logger(__name__)
+
+# 每個工作各自不同、且 yt_dlp 於執行期才讀取的選項；其餘選項（postprocessors、quiet 等）
+# 在建構 YoutubeDL 時就已套用，視為實例的設定檔（profile），相同設定檔的實例可重複使用
+JOB_OPTION_KEYS = {
+    'format', 'outtmpl', 'progress_hooks', 'postprocessor_hooks',
+    'writesubtitles', 'writeautomaticsub', 'subtitleslangs', 'subtitlesformat',
+}
+_MISSING = object()
+
+def _profile_key(profile_opts):
+    return json.dumps(profile_opts, sort_keys=True, default=repr)
+
+class YoutubeDLPool:
+    """
+    以選項設定檔為鍵的 YoutubeDL 實例池。
+    建立 YoutubeDL 需初始化所有 extractor、cookie jar 與 HTTP opener，
+    播放清單中每支影片都重新建立的成本很高；改為租借長期存在的實例，
+    再把 outtmpl、format、hooks 等每個工作各自的選項暫時套用上去，歸還時還原。
+    同一個實例同時只會借給一個執行緒。
+    """
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = {}  # 設定檔 -> 閒置實例清單
+        self._created = 0
+
+    def configure(self, max_idle):
+        self.max_idle = max_idle
+
+    @contextmanager
+    def lease(self, ydl_opts):
+        """
+        租借符合 ydl_opts 的 YoutubeDL 實例，用法與 `with yt_dlp.YoutubeDL(ydl_opts) as ydl` 相同。
+        """
+        profile_opts = {k: v for k, v in ydl_opts.items() if k not in JOB_OPTION_KEYS}
+        job_opts = {k: v for k, v in ydl_opts.items() if k in JOB_OPTION_KEYS}
+        key = _profile_key(profile_opts)
+        with self._lock:
+            idle = self._idle.get(key)
+            ydl = idle.pop() if idle else None
+        if ydl is None:
+            import yt_dlp  # 延遲載入：yt_dlp 匯入需載入上千個 extractor，只在第一次使用時付出
+            ydl = yt_dlp.YoutubeDL(dict(profile_opts))
+            with self._lock:
+                self._created += 1
+                logger.info(f"Created YoutubeDL instance #{self._created} for profile {key}")
+
+        restore = self._apply(ydl, job_opts)
+        try:
+            yield ydl
+        finally:
+            restore()
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(ydl)
+                    ydl = None
+            if ydl is not None:
+                ydl.close()
+
+    def _apply(self, ydl, job_opts):
+        """將工作選項套用到實例上，回傳還原用的函式"""
+        saved_params = {}
+        saved_selector = ydl.format_selector
+        for name, value in job_opts.items():
+            if name in ('progress_hooks', 'postprocessor_hooks'):
+                continue
+            saved_params[name] = ydl.params.get(name, _MISSING)
+            if name == 'outtmpl':
+                # 建構時 outtmpl 已被正規化為 {'default': ..., 'chapter': ...}
+                overlay = value if isinstance(value, dict) else {'default': value}
+                ydl.params['outtmpl'] = {**saved_params[name], **overlay}
+            else:
+                ydl.params[name] = value
+        if 'format' in job_opts:
+            fmt = job_opts['format']
+            ydl.format_selector = fmt if fmt in (None, '-') or callable(fmt) else ydl.build_format_selector(fmt)
+
+        progress_hooks = list(job_opts.get('progress_hooks', []))
+        pp_hooks = list(job_opts.get('postprocessor_hooks', []))
+        for hook in progress_hooks:
+            ydl.add_progress_hook(hook)
+        for hook in pp_hooks:
+            # 會一併加到已建立的 postprocessor（例如 FFmpegExtractAudio）上
+            ydl.add_postprocessor_hook(hook)
+
+        def restore():
+            for name, value in saved_params.items():
+                if value is _MISSING:
+                    ydl.params.pop(name, None)
+                else:
+                    ydl.params[name] = value
+            ydl.format_selector = saved_selector
+            for hook in progress_hooks:
+                ydl._progress_hooks.remove(hook)
+            for hook in pp_hooks:
+                ydl._postprocessor_hooks.remove(hook)
+                for pps in ydl._pps.values():
+                    for pp in pps:
+                        if hook in pp._progress_hooks:
+                            pp._progress_hooks.remove(hook)
+        return restore
+
+ydl_pool = YoutubeDLPool()